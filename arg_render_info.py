@@ -1,27 +1,292 @@
+import hashlib
+import heapq
+import json
+import numpy as np
+import scipy.sparse
+import struct
+import time
+import zipfile
+
+from collections import Counter, deque
+from collections.abc import Mapping, MutableMapping, Sequence
 from dataclasses import dataclass
+from multiprocessing import shared_memory
+from pathlib import Path
 
-@dataclass
-class NodeRenderInfo:
+# Node roles, stored per node in ArgRenderInfo.node_role
+ROLE_LEAF = 0
+ROLE_ROOT = 1
+ROLE_INTERIOR = 2
+
+# Above this fraction of nodes and edges changed, update() rebuilds all
+INCREMENTAL_UPDATE_FRACTION = 0.25
+
+# Bumped whenever the ArgRenderInfo.save() layout changes
+SAVE_FORMAT_VERSION = 1
+
+# Byte alignment of each array within a shared memory block
+SHARED_ALIGNMENT = 64
+
+
+def _csr_index(keys, size):
+    """
+    Compressed sparse row index grouping rows by integer key in [0, size).
+    Returns the row order sorted by key and indptr, such that rows with key k
+    are order[indptr[k]:indptr[k + 1]].
+    """
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return order, indptr
+
+
+def _csr_gather(indptr, keys):
+    """
+    Positions into a _csr_index order of all rows for given keys
+    """
+    starts = indptr[keys]
+    counts = indptr[keys + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum())
+
+
+def _running_max_by_group(group, ranks, rank_count):
+    """
+    Running max of integer ranks in [0, rank_count) within each run of equal
+    group values, kept to its run by offsetting ranks by run number
+    """
+    offset = np.cumsum(np.concatenate([[0], group[1:] != group[:-1]])) * rank_count
+    return np.maximum.accumulate(ranks + offset) - offset
+
+
+def _merge_segments(node, start, end):
+    """
+    Union of [start, end) segments per node, merging any that overlap or
+    abut. Returns node, start and end of merged segments sorted by node and
+    start.
+    """
+    order = np.lexsort((start, node))
+    node = node[order]
+    start = start[order]
+    end = end[order]
+
+    positions, ranks = np.unique(np.concatenate([start, end]), return_inverse=True)
+    start_rank = ranks[:len(start)]
+    reach = _running_max_by_group(node, ranks[len(start):], len(positions))
+
+    new_run = np.ones(len(node), dtype=bool)
+    new_run[1:] = (node[1:] != node[:-1]) | (start_rank[1:] > reach[:-1])
+    first = np.flatnonzero(new_run)
+    last = np.concatenate([first[1:], [len(node)]]) - 1
+    return node[first], start[first], positions[reach[last]]
+
+
+def _load_npz(filename, mmap):
+    """
+    Arrays from an .npz file by name. np.load cannot memory-map .npz members,
+    so with mmap the zip entries of an uncompressed file are located and each
+    array is mapped copy-on-write directly from its offset.
+    """
+    if not mmap:
+        with np.load(filename) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    arrays = {}
+    with zipfile.ZipFile(filename) as zip_file, open(filename, "rb") as file:
+        for info in zip_file.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{filename}: cannot mmap compressed member {info.filename}")
+
+            # Skip local file header to start of .npy data
+            file.seek(info.header_offset)
+            local_header = file.read(30)
+            name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+            file.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+
+            name = info.filename.removesuffix(".npy")
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(
+                    filename,
+                    dtype=dtype,
+                    mode="c",
+                    offset=file.tell(),
+                    shape=shape,
+                    order="F" if fortran_order else "C"
+                )
+    return arrays
+
+
+class _ColumnStore:
+    """
+    Growable struct-of-arrays storage with one typed NumPy array per column.
+    Arrays are over-allocated by doubling so appends are amortised O(1), and
+    column attributes return views trimmed to the used size, e.g. `store.height`
+    is an array of all heights.
+    """
+    def __init__(self, **dtypes):
+        self._dtypes = dtypes
+        self.clear()
+
+    def __len__(self):
+        return self.size
+
+    def __getattr__(self, name):
+        arrays = self.__dict__.get("_arrays")
+        if arrays is None or name not in arrays:
+            raise AttributeError(name)
+        return arrays[name][:self.size]
+
+    @property
+    def capacity(self):
+        return len(next(iter(self._arrays.values())))
+
+    @property
+    def nbytes(self):
+        return sum(array[:self.size].nbytes for array in self._arrays.values())
+
+    def clear(self):
+        self.size = 0
+        self._arrays = {
+            name: np.empty(0, dtype=dtype)
+            for name, dtype in self._dtypes.items()
+        }
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[name] = grown
+
+    def append(self, *values):
+        if self.size == self.capacity:
+            self.reserve(max(16, self.capacity * 2))
+        index = self.size
+        for array, value in zip(self._arrays.values(), values):
+            array[index] = value
+        self.size += 1
+        return index
+
+    def assign(self, arrays):
+        """
+        Replace contents with given equal-length column arrays, which are used
+        as-is rather than copied, e.g. memory-mapped arrays from a file
+        """
+        self._arrays = {
+            name: np.asarray(arrays[name], dtype=dtype)
+            for name, dtype in self._dtypes.items()
+        }
+        self.size = len(next(iter(self._arrays.values())))
+
+    def compress(self, mask):
+        """
+        Keep only rows where mask is set, preserving order
+        """
+        self.assign({name: array[:self.size][mask] for name, array in self._arrays.items()})
+
+    def swap_remove(self, index):
+        """
+        Remove row by moving the last row into its place, returning the
+        moved row's previous index
+        """
+        last = self.size - 1
+        for array in self._arrays.values():
+            array[index] = array[last]
+        self.size -= 1
+        return last
+
+    def get(self, name, index):
+        return self._arrays[name][index].item()
+
+    def set(self, name, index, value):
+        self._arrays[name][index] = value
+
+
+class _ColumnField:
+    """
+    Descriptor exposing one column of a _ColumnStore as an attribute on a row
+    view. Columns that cannot hold None store `missing` in its place, e.g. NaN
+    for an unset x position.
+    """
+    def __init__(self, missing=None):
+        self.missing = missing
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        value = view._store.get(self.name, view.index)
+        if self.missing is not None and (value != value or value == self.missing):
+            return None
+        return value
+
+    def __set__(self, view, value):
+        if value is None:
+            value = self.missing
+        view._store.set(self.name, view.index, value)
+
+
+class _RowView:
+    """
+    Lightweight view of a single row in a _ColumnStore, so the per-node and
+    per-edge memos cost no memory beyond the column arrays.
+    """
+    __slots__ = ("_store", "index")
+    _fields = ()
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index
+
+    def __eq__(self, other):
+        return (
+            type(self) is type(other) and
+            self._store is other._store and
+            self.index == other.index
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class NodeRenderInfo(_RowView):
     """
     Memo for ARG node render, represented as a 3D line parallel to y
     y axis (hence start and end position along y) with x position
     determined by layout code in ArgRenderInfo. This is separate from
     arg-needle-lib internals so new theoretical structures may be
     sketched.
+
+    Instances are views onto a row of ArgRenderInfo.node_columns, so reading
+    or writing a field reads or writes the underlying arrays.
     """
-    id: int
-    height: float
-    start: float
-    end: float
-    x_pos: float
-    depth: int
+    __slots__ = ()
+    _fields = ("id", "height", "start", "end", "x_pos", "depth")
+
+    id = _ColumnField()
+    height = _ColumnField()
+    start = _ColumnField()
+    end = _ColumnField()
+    x_pos = _ColumnField(missing=np.nan)
+    depth = _ColumnField(missing=-1)
 
     def __hash__(self):
         return hash(self.id)
 
 
-@dataclass
-class EdgeRenderInfo:
+class EdgeRenderInfo(_RowView):
     """
     Memo for ARG edge render, represented as a 3D rectangle between
     existing nodes. The edge may run only a sub-span of nodes it connects
@@ -29,57 +294,429 @@ class EdgeRenderInfo:
     y axis, with orientation determined by parent and child node positions.
     Like NodeRenderInfo, this is separate from arg-needle-lib classes
     to articulate experimental structures.
+
+    Instances are views onto a row of ArgRenderInfo.edge_columns.
     """
-    parent_id: int
-    child_id: int
-    start: float
-    end: float
+    __slots__ = ()
+    _fields = ("parent_id", "child_id", "start", "end")
+
+    parent_id = _ColumnField()
+    child_id = _ColumnField()
+    start = _ColumnField()
+    end = _ColumnField()
 
     def __hash__(self):
         ID_SCALE = 2 ** 32
         return hash(self.child_id * ID_SCALE + self.start)
 
 
+class _RowSequence(Sequence):
+    """
+    Read-only sequence of row views over a _ColumnStore, standing in for the
+    plain lists of memos, e.g. `for node in render_info.nodes`.
+    """
+    def __init__(self, store, view_type):
+        self._store = store
+        self._view_type = view_type
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._view_type(self._store, index)
+
+
+class _AdjacencyCounters(MutableMapping):
+    """
+    Per-row Counters of adjacent rows and how many edges link them, for
+    incremental updates. Counters are built on first access from CSR arrays
+    of distinct adjacent rows and edge counts, so creating this over a large
+    ARG is as cheap as the arrays.
+    """
+    def __init__(self, indptr, others, counts):
+        self._indptr = indptr
+        self._others = others
+        self._counts = counts
+        self._counters = {}
+        self._removed = set()
+
+    def _load(self, row):
+        counter = self._counters.get(row)
+        if counter is not None or row in self._removed or row >= len(self._indptr) - 1:
+            return counter
+        lo, hi = self._indptr[row], self._indptr[row + 1]
+        if lo == hi:
+            return None
+        counter = Counter(dict(zip(self._others[lo:hi].tolist(), self._counts[lo:hi].tolist())))
+        self._counters[row] = counter
+        return counter
+
+    def __getitem__(self, row):
+        counter = self._load(row)
+        if counter is None:
+            raise KeyError(row)
+        return counter
+
+    def __setitem__(self, row, counter):
+        self._counters[row] = counter
+        self._removed.discard(row)
+
+    def __delitem__(self, row):
+        self[row]
+        del self._counters[row]
+        self._removed.add(row)
+
+    def __iter__(self):
+        rows = set(self._counters)
+        rows.update(np.flatnonzero(np.diff(self._indptr)).tolist())
+        return (row for row in sorted(rows) if self._load(row) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _NodeLookup(Mapping):
+    """
+    Node id to NodeRenderInfo mapping backed by ArgRenderInfo's sorted id
+    index rather than a dict of objects.
+    """
+    def __init__(self, render_info):
+        self._render_info = render_info
+
+    def __len__(self):
+        return len(self._render_info.nodes)
+
+    def __iter__(self):
+        return iter(self._render_info.node_columns.id.tolist())
+
+    def __getitem__(self, id):
+        index = self._render_info.node_indices(id)
+        if index < 0:
+            raise KeyError(id)
+        return self._render_info.nodes[index]
+
+
+class BarycentreLayout:
+    """
+    Optional crossing-reducing layout engine for ArgRenderInfo. By default
+    leaf x positions come from node id; this instead refines leaf order by
+    alternating barycentre sweeps over per-depth sparse adjacency matrices:
+
+    - up, placing each parent at the mean of its children as the final render
+      does, then
+    - down, moving each node towards the mean of its parents from the top
+      layer downward, and re-sorting leaves by where they land.
+
+    Total horizontal edge length is used as a cheap proxy for crossings, and
+    the leaf order with the lowest is kept. Sweeps stop when the order no
+    longer changes, after `iterations`, or once `time_limit` seconds pass.
+    """
+    def __init__(self, iterations: int=20, time_limit: float=None):
+        self.iterations = iterations
+        self.time_limit = time_limit
+
+    def leaf_x_pos(self, depth, x_pos, pairs, leaf_rows):
+        """
+        Return x positions for leaf_rows, given node depths, current x
+        positions and distinct (parent, child) row pairs.
+        """
+        start_time = time.perf_counter()
+        node_count = len(depth)
+        parents = pairs[:, 0]
+        children = pairs[:, 1]
+
+        # Row-normalised adjacency so a matrix-vector product is a mean
+        ones = np.ones(len(pairs))
+        child_adj = scipy.sparse.csr_matrix((ones, (parents, children)), shape=(node_count, node_count))
+        parent_adj = child_adj.T.tocsr()
+        child_mean = self._row_normalise(child_adj)
+        parent_mean = self._row_normalise(parent_adj)
+
+        # Per-layer row slices, up from depth 1 and down to depth 0
+        max_depth = depth.max()
+        up_layers = []
+        down_layers = []
+        for layer_depth in range(1, max_depth + 1):
+            rows = np.flatnonzero(depth == layer_depth)
+            up_layers.append((rows, child_mean[rows]))
+        for layer_depth in range(max_depth - 1, -1, -1):
+            rows = np.flatnonzero((depth == layer_depth) & (np.diff(parent_adj.indptr) > 0))
+            down_layers.append((rows, parent_mean[rows]))
+
+        x_pos = x_pos.copy()
+        leaf_order = np.argsort(x_pos[leaf_rows], kind="stable")
+        best_cost = np.inf
+        best_x_pos = x_pos[leaf_rows]
+        for _ in range(self.iterations):
+            for rows, mean in up_layers:
+                x_pos[rows] = mean @ x_pos
+
+            cost = np.abs(x_pos[parents] - x_pos[children]).sum()
+            if cost < best_cost:
+                best_cost = cost
+                best_x_pos = x_pos[leaf_rows].copy()
+
+            if self.time_limit is not None and time.perf_counter() - start_time > self.time_limit:
+                break
+
+            for rows, mean in down_layers:
+                x_pos[rows] = mean @ x_pos
+
+            # Re-sort leaves by barycentre, breaking ties by previous order
+            previous_rank = np.empty(len(leaf_rows), dtype=np.int64)
+            previous_rank[leaf_order] = np.arange(len(leaf_rows))
+            new_order = np.lexsort((previous_rank, x_pos[leaf_rows]))
+            x_pos[leaf_rows[new_order]] = np.arange(len(leaf_rows))
+            if np.array_equal(new_order, leaf_order):
+                break
+            leaf_order = new_order
+
+        return best_x_pos
+
+    @staticmethod
+    def _row_normalise(adj):
+        counts = np.diff(adj.indptr)
+        scale = 1 / np.maximum(counts, 1)
+        return scipy.sparse.diags(scale) @ adj
+
+
+@dataclass
+class ValidationReport:
+    """
+    Structural problems found by ArgRenderInfo.validate(). Node problems hold
+    offending node ids, and edge problems offending edge row indices.
+    """
+    missing_endpoints: np.ndarray    # Edges whose parent or child id is unknown
+    unconnected_nodes: np.ndarray    # Nodes with no edges
+    empty_nodes: np.ndarray          # Nodes with start >= end
+    inverted_edges: np.ndarray       # Edges whose parent is not above child
+    edges_outside_nodes: np.ndarray  # Edge spans not inside both nodes' spans
+    overlapping_edges: np.ndarray    # Edges overlapping another with same pair
+
+    @property
+    def counts(self):
+        return {name: len(value) for name, value in vars(self).items()}
+
+    @property
+    def ok(self):
+        return not any(self.counts.values())
+
+
+class SharedRenderInfo:
+    """
+    Handle to ArgRenderInfo arrays published into a shared memory block by
+    ArgRenderInfo.publish(). The handle is small and picklable, so can be
+    passed to worker processes which then call ArgRenderInfo.attach() on it.
+    The publishing process owns the block: close() and unlink() it, or use
+    the handle as a context manager, once workers are done.
+    """
+    def __init__(self, settings, arrays):
+        self.settings = settings
+        self.layout = []
+        offset = 0
+        for name, array in arrays.items():
+            self.layout.append((name, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+
+        self._shared_memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.name = self._shared_memory.name
+        for (name, dtype, shape, offset), array in zip(self.layout, arrays.values()):
+            np.ndarray(shape, dtype, self._shared_memory.buf, offset)[...] = array
+
+    @property
+    def nbytes(self):
+        return self._shared_memory.size if self._shared_memory else 0
+
+    def __getstate__(self):
+        return {**self.__dict__, "_shared_memory": None}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+
+    def close(self):
+        if self._shared_memory:
+            self._shared_memory.close()
+
+    def unlink(self):
+        """
+        Free the block once all processes have closed it. Only call from the
+        publishing process.
+        """
+        if self._shared_memory:
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+
 class ArgRenderInfo:
-    def __init__(self, arg=None, quantise=False):
+    def __init__(
+        self,
+        arg=None,
+        quantise=False,
+        layout: BarycentreLayout=None,
+        window: tuple=None,
+        coalesce=False
+    ):
+        """
+        Optional window is a [start, end) genome region of interest. Only edges
+        intersecting it are kept, with edge and node spans clipped to it, and
+        nodes left without edges are dropped.
+
+        With coalesce, update() merges edges between the same parent and child
+        whose spans abut into single edges, see coalesce_edges().
+        """
         self.quantise = quantise
+        self.layout = layout
+        self.window = window
+        self.coalesce = coalesce
+        self.coalesced_edge_count = 0
+        self.validation_report = None
+        self.frozen = False
+        self._shared_memory = None
+
+        # Nodes and edges are stored as columns of typed arrays, with
+        # NodeRenderInfo and EdgeRenderInfo views created on access. Node role
+        # and edge endpoint row indices are derived in update().
+        self.node_columns = _ColumnStore(
+            id=np.int64,
+            height=np.float64,
+            start=np.float64,
+            end=np.float64,
+            x_pos=np.float64,
+            depth=np.int32,
+            role=np.int8
+        )
+        self.edge_columns = _ColumnStore(
+            parent_id=np.int64,
+            child_id=np.int64,
+            start=np.float64,
+            end=np.float64,
+            parent_index=np.int64,
+            child_index=np.int64
+        )
+        self.nodes = _RowSequence(self.node_columns, NodeRenderInfo)
+        self.edges = _RowSequence(self.edge_columns, EdgeRenderInfo)
+        self.node_by_id = _NodeLookup(self)
+
         if arg:
             self.build_from_arg(arg)
         else:
             self.clear()
 
     def clear(self):
-        self.nodes = []
-        self.edges = []
+        self._check_not_frozen()
+        self.node_columns.clear()
+        self.edge_columns.clear()
         self._clear_maps()
         self.dirty = True
 
     def add_node(self, id: int, height: float, start: float, end: float):
-        node = NodeRenderInfo(
+        self._check_not_frozen()
+        if self.window:
+            start, end = self._clip_to_window(start, end)
+        index = self.node_columns.append(
             id,
             height,
             start,
             end,
             id, # Use sample ID as first approximation of x position
-            None
+            -1,
+            ROLE_LEAF
         )
-        self.nodes.append(node)
+        self._pending_nodes.add(index)
         self.dirty = True
-        return node
+        return NodeRenderInfo(self.node_columns, index)
 
     def add_edge(self, parent_id: int, child_id: int, start: float, end: float):
-        edge = EdgeRenderInfo(
+        """
+        Add edge, returning None if it lies outside window
+        """
+        self._check_not_frozen()
+        if self.window:
+            if not self._in_window(start, end):
+                return None
+            start, end = self._clip_to_window(start, end)
+        index = self.edge_columns.append(
             parent_id,
             child_id,
             start,
-            end
+            end,
+            -1,
+            -1
         )
-        self.edges.append(edge)
+        self._pending_edges.add(index)
         self.dirty = True
-        return edge
+        return EdgeRenderInfo(self.edge_columns, index)
+
+    def remove_node(self, id: int):
+        """
+        Remove node with given id and any edges to or from it. Note that row
+        views previously returned for nodes and edges may be invalidated as
+        the last row is moved into the removed one.
+        """
+        self._check_not_frozen()
+        nc = self.node_columns
+        ec = self.edge_columns
+        rows = np.flatnonzero(nc.id == id)
+        if not len(rows):
+            raise KeyError(id)
+
+        edge_rows = np.flatnonzero((ec.parent_id == id) | (ec.child_id == id))
+        for edge_row in edge_rows[::-1]:
+            self._remove_edge_row(edge_row)
+
+        row = rows[0]
+        incremental = not self._full_update_needed and row not in self._pending_nodes
+        self._pending_nodes.discard(row)
+        self._touched_nodes.discard(row)
+        if incremental:
+            keep = self._id_order != row
+            self._id_order = self._id_order[keep]
+            self._sorted_ids = self._sorted_ids[keep]
+            self._dense_ids = False
+
+        moved = nc.swap_remove(row)
+        if moved != row:
+            if moved in self._pending_nodes:
+                self._pending_nodes.discard(moved)
+                self._pending_nodes.add(row)
+            elif not self._full_update_needed:
+                self._relabel_node_row(moved, row)
+
+        self.dirty = True
+
+    def remove_edge(self, parent_id: int, child_id: int, start: float, end: float):
+        """
+        Remove first edge matching ids and span. As with remove_node, the last
+        edge row is moved into the removed one.
+        """
+        self._check_not_frozen()
+        ec = self.edge_columns
+        rows = np.flatnonzero(
+            (ec.parent_id == parent_id) &
+            (ec.child_id == child_id) &
+            (ec.start == start) &
+            (ec.end == end)
+        )
+        if not len(rows):
+            raise KeyError((parent_id, child_id, start, end))
+
+        self._remove_edge_row(rows[0])
 
     def build_from_arg(self, arg):
         self.clear()
+        if self.window:
+            self._build_from_arg_window(arg)
+            return
 
         for node_id in arg.node_ids():
             # Create memo of node rendering info per arg node
@@ -105,145 +742,1112 @@ class ArgRenderInfo:
 
         self.update(False)
 
-    def update(self, validate=False):
+    def _build_from_arg_window(self, arg):
         """
-        Build internal lookup maps from nodes and edges. Validate checks that
-        ARG is fully-connected but can be left off whilst it's still being
-        constructed, e.g. debug rendering during threading.
+        As build_from_arg, but only adding edges in window and the nodes they
+        join, so memory scales with the window rather than the genome.
+        arg-needle-lib nodes span the whole ARG, so cannot be skipped by span.
         """
-        if not self.dirty:
-            return
+        edges = []
+        for node_id in arg.node_ids():
+            for arg_edge in arg.node(node_id).parent_edges():
+                if self._in_window(arg_edge.start, arg_edge.end):
+                    edges.append((arg_edge.parent.ID, node_id, arg_edge.start, arg_edge.end))
 
-        self._clear_maps()
+        if edges:
+            node_ids = sorted({id for edge in edges for id in edge[:2]})
+        else:
+            # As _drop_nodes_outside_window, keep nodes whose span meets window
+            node_ids = [
+                node_id for node_id in arg.node_ids()
+                if self._in_window(arg.node(node_id).start, arg.node(node_id).end)
+            ]
+
+        for node_id in node_ids:
+            arg_node = arg.node(node_id)
+            node = self.add_node(node_id, arg_node.height, arg_node.start, arg_node.end)
+            node.x_pos = node_id
+        for edge in edges:
+            self.add_edge(*edge)
+
+        self.update(False)
+
+    @classmethod
+    def from_tree_sequence(
+        cls,
+        ts,
+        quantise=False,
+        layout: BarycentreLayout=None,
+        window: tuple=None,
+        coalesce=False
+    ):
+        """
+        Build directly from a tskit TreeSequence's node and edge columns,
+        skipping conversion to an arg-needle-lib ARG and per-edge Python
+        loops. Node ids are tskit node ids, heights are node times, and node
+        spans are the extent of edges to or from each node (the full sequence
+        for nodes without edges).
+        """
+        ri = cls(quantise=quantise, layout=layout, window=window, coalesce=coalesce)
+        node_count = ts.num_nodes
+        parent = ts.edges_parent
+        child = ts.edges_child
+        left = ts.edges_left
+        right = ts.edges_right
+
+        if window:
+            # Filter edges before anything is materialised
+            in_window = ri._in_window(left, right)
+            parent = parent[in_window]
+            child = child[in_window]
+            left, right = ri._clip_to_window(left[in_window], right[in_window])
+
+        # Node span from min/max over edges in either direction
+        node_start = np.full(node_count, np.inf)
+        node_end = np.full(node_count, -np.inf)
+        for endpoint in (parent, child):
+            np.minimum.at(node_start, endpoint, left)
+            np.maximum.at(node_end, endpoint, right)
+        no_edges = node_start > node_end
+        node_start[no_edges] = 0
+        node_end[no_edges] = ts.sequence_length
+        if window:
+            node_start, node_end = ri._clip_to_window(node_start, node_end)
+
+        ids = np.arange(node_count, dtype=np.int64)
+        ri.node_columns.assign({
+            "id": ids,
+            "height": np.array(ts.nodes_time),
+            "start": node_start,
+            "end": node_end,
+            "x_pos": ids.astype(np.float64), # As build_from_arg, id is first approximation
+            "depth": np.full(node_count, -1),
+            "role": np.full(node_count, ROLE_LEAF),
+        })
+        ri.edge_columns.assign({
+            "parent_id": np.array(parent),
+            "child_id": np.array(child),
+            "start": np.array(left),
+            "end": np.array(right),
+            "parent_index": np.full(len(parent), -1),
+            "child_index": np.full(len(parent), -1),
+        })
+        ri.invalidate()
+        ri.update(False)
+        return ri
+
+    def induced_subgraph(self, sample_ids, simplify=True):
+        """
+        New ArgRenderInfo holding only the ancestry of given sample ids: nodes
+        reachable upward from them, and edges clipped to the genome spans
+        along which they carry those samples' ancestral material. Computed as
+        an upward sweep over edge arrays, one depth layer at a time.
+
+        With simplify, nodes are only kept over spans where material from two
+        or more children meets, as in tskit simplify, so unary nodes and the
+        chain above the samples' roots are removed. Samples are always kept.
+        """
+        self._update_if_dirty()
+        nc = self.node_columns
+        ec = self.edge_columns
+        samples = np.unique(self.node_indices(sample_ids))
+        if not len(samples) or samples[0] < 0:
+            raise KeyError(sample_ids)
 
-        # Make a fast node lookup dict
-        for node in self.nodes:
-            self.node_by_id[node.id] = node
+        valid = (ec.parent_index >= 0) & (ec.child_index >= 0)
+        parent_index = ec.parent_index[valid]
+        child_index = ec.child_index[valid]
+        edge_start = ec.start[valid]
+        edge_end = ec.end[valid]
+        edge_order, edges_by_child = _csr_index(child_index, len(nc))
 
-        # Collate used nodes during edge traversal
-        all_node_ids = set([node.id for node in self.nodes])
-        used_parent_ids = set()
-        used_child_ids = set()
+        keep_node = np.zeros(len(nc), dtype=bool)
+        keep_node[samples] = True
+        if not simplify:
+            keep_node[:] = True
 
-        for edge in self.edges:
-            if validate:
-                assert edge.parent_id in all_node_ids
-                assert edge.child_id in all_node_ids
+        # Ancestral segments waiting to be propagated, bucketed by node depth.
+        # Each maps a span of a node's material to the nearest kept node below
+        # it that carries it.
+        depth = nc.depth
+        pending = [[] for _ in range(int(depth.max()) + 1)]
+        for node_depth in np.unique(depth[samples]):
+            at_depth = samples[depth[samples] == node_depth]
+            pending[node_depth].append((at_depth, nc.start[at_depth], nc.end[at_depth], at_depth))
 
-            used_parent_ids.add(edge.parent_id)
-            used_child_ids.add(edge.child_id)
+        kept = []
+        for layer in pending:
+            if not layer:
+                continue
+            node, start, end, below, edges = self._coalesce_layer(
+                keep_node,
+                *map(np.concatenate, zip(*layer))
+            )
+            kept.append(edges)
+
+            # Clip each edge up from these nodes to each of its child's segments
+            counts = edges_by_child[node + 1] - edges_by_child[node]
+            edge = edge_order[_csr_gather(edges_by_child, node)]
+            segment = np.repeat(np.arange(len(node)), counts)
+            clip_start = np.maximum(start[segment], edge_start[edge])
+            clip_end = np.minimum(end[segment], edge_end[edge])
+            overlaps = clip_start < clip_end
+            parent = parent_index[edge[overlaps]]
+            segment = segment[overlaps]
+            for parent_depth in np.unique(depth[parent]):
+                at_depth = depth[parent] == parent_depth
+                pending[parent_depth].append((
+                    parent[at_depth],
+                    clip_start[overlaps][at_depth],
+                    clip_end[overlaps][at_depth],
+                    below[segment[at_depth]]
+                ))
+
+        parent, child, start, end = map(np.concatenate, zip(*kept))
+
+        # Node spans from kept edges, as from_tree_sequence, other than samples
+        rows = np.unique(np.concatenate([samples, parent, child]))
+        node_start = np.full(len(nc), np.inf)
+        node_end = np.full(len(nc), -np.inf)
+        for endpoint in (parent, child):
+            np.minimum.at(node_start, endpoint, start)
+            np.maximum.at(node_end, endpoint, end)
+        node_start[samples] = nc.start[samples]
+        node_end[samples] = nc.end[samples]
+
+        ri = ArgRenderInfo(
+            quantise=self.quantise,
+            layout=self.layout,
+            window=self.window,
+            coalesce=self.coalesce
+        )
+        ri.node_columns.assign({
+            "id": nc.id[rows],
+            "height": nc.height[rows],
+            "start": node_start[rows],
+            "end": node_end[rows],
+            "x_pos": nc.x_pos[rows], # Keeps sample order from full layout
+            "depth": np.full(len(rows), -1),
+            "role": np.full(len(rows), ROLE_LEAF),
+        })
+        ri.edge_columns.assign({
+            "parent_id": nc.id[parent],
+            "child_id": nc.id[child],
+            "start": start,
+            "end": end,
+            "parent_index": np.full(len(parent), -1),
+            "child_index": np.full(len(parent), -1),
+        })
 
-            # Fast lookup of all edges for a given node
-            self.edges_by_child_node_id.setdefault(
-                edge.child_id,
-                set()
-            ).add(edge)
+        # Segments are split at every breakpoint, so merge fragments back
+        ri.coalesce_edges()
+        ri.invalidate()
+        ri.update(False)
+        return ri
+
+    @staticmethod
+    def _coalesce_layer(keep_node, node, start, end, below):
+        """
+        Resolve incoming ancestral segments for a layer of nodes. Where a node
+        is kept, or two or more segments overlap, it becomes the nearest kept
+        node for that span and gains edges down to each segment's kept node.
+        Elsewhere segments pass through unchanged. Returns merged outgoing
+        node, start, end and kept-node-below arrays, plus new edges as parent,
+        child, start and end arrays.
+        """
+        node_count = len(keep_node)
+
+        # Elementary intervals between each node's sorted segment endpoints,
+        # with count of segments covering each
+        positions, ranks = np.unique(np.concatenate([start, end]), return_inverse=True)
+        keys, key_index = np.unique(
+            np.concatenate([node, node]) * len(positions) + ranks,
+            return_inverse=True
+        )
+        start_index = key_index[:len(node)]
+        end_index = key_index[len(node):]
+        coverage = np.cumsum(
+            np.bincount(start_index, minlength=len(keys)) -
+            np.bincount(end_index, minlength=len(keys))
+        )
+        interval_node = keys // len(positions)
+        interval_start = positions[keys % len(positions)]
+        interval_end = positions[np.roll(keys, -1) % len(positions)]
+        coalescent = (coverage > 0) & ((coverage > 1) | keep_node[interval_node])
 
-            # Fast lookup of all breakpoints from edge
-            self.breakpoint_positions.add(edge.start)
-            self.breakpoint_positions.add(edge.end)
+        # Split segments into elementary interval pieces
+        piece_counts = end_index - start_index
+        segment = np.repeat(np.arange(len(node)), piece_counts)
+        interval = np.repeat(start_index - np.cumsum(piece_counts) + piece_counts, piece_counts)
+        interval += np.arange(len(segment))
 
+        joins = coalescent[interval] & (below[segment] != node[segment])
+        edges = (
+            node[segment[joins]],
+            below[segment[joins]],
+            interval_start[interval[joins]],
+            interval_end[interval[joins]]
+        )
+
+        passes = ~coalescent[interval]
+        out_node = np.concatenate([interval_node[coalescent], node[segment[passes]]])
+        out_below = np.concatenate([interval_node[coalescent], below[segment[passes]]])
+        out_start = np.concatenate([interval_start[coalescent], interval_start[interval[passes]]])
+        out_end = np.concatenate([interval_end[coalescent], interval_end[interval[passes]]])
+
+        # Merge abutting pieces with the same node and kept node below
+        group, out_start, out_end = _merge_segments(out_node * node_count + out_below, out_start, out_end)
+        return group // node_count, out_start, out_end, group % node_count, edges
+
+    def update(self, validate=False):
+        """
+        Build internal lookup arrays from nodes and edges. If validate is set,
+        the report from validate() is left in validation_report.
+
+        Changes since the last update are applied incrementally when small,
+        so only nodes touched by added or removed edges and their ancestors
+        have depth and x_pos recomputed. Otherwise, or when quantising, the
+        whole layout is rebuilt.
+
+        If coalescing, the number of edges merged away by this update is left
+        in coalesced_edge_count. Incremental updates only check edges between
+        the same nodes as added edges, but merging any moves edge rows, so
+        forces a full update.
+        """
+        if self.dirty:
+            self._update_lookups()
+        else:
+            self.coalesced_edge_count = 0
         if validate:
-            # Check all ids used
-            all_processed_ids = used_parent_ids | used_child_ids
-            assert all_processed_ids == all_node_ids
+            self.validation_report = self.validate()
+
+    def _update_if_dirty(self):
+        """
+        Bring lookups up to date for internal use, leaving stats from the
+        last update() in place
+        """
+        if self.dirty:
+            self._update_lookups()
 
-        # Intersection and differences of ids informs basic leaf/root/internal
-        leaf_ids = all_node_ids - used_parent_ids
-        root_ids = used_parent_ids - used_child_ids - leaf_ids
-        interior_ids = all_node_ids - leaf_ids - root_ids
+    def validate(self):
+        """
+        Check structure over whole node and edge arrays, returning a
+        ValidationReport rather than raising, so it is cheap enough to run on
+        every frame and reports every problem at once. Checks that edge
+        endpoints exist, parents are higher than children, edge spans sit
+        within both nodes' spans, node spans are not empty, all nodes have
+        edges and edges between the same pair do not overlap.
+        """
+        self._update_if_dirty()
+        nc = self.node_columns
+        ec = self.edge_columns
+        parent = ec.parent_index
+        child = ec.child_index
+        resolved = (parent >= 0) & (child >= 0)
+        resolved_rows = np.flatnonzero(resolved)
+        parent = parent[resolved]
+        child = child[resolved]
 
-        self.leaf_nodes = set([self.node_by_id[id] for id in leaf_ids])
-        self.root_nodes = set([self.node_by_id[id] for id in root_ids])
-        self.interior_nodes = set([self.node_by_id[id] for id in interior_ids])
+        connected = np.zeros(len(nc), dtype=bool)
+        connected[parent] = True
+        connected[child] = True
+        if not len(ec):
+            connected[:] = True
 
-        self._compute_x_pos_and_depth()
-        self.dirty = False
+        outside = np.zeros(len(resolved_rows), dtype=bool)
+        for endpoint in (parent, child):
+            outside |= (ec.start[resolved] < nc.start[endpoint]) | (ec.end[resolved] > nc.end[endpoint])
+
+        # Sorted by pair then start, an edge overlaps if it starts before the
+        # furthest end so far for its pair
+        start = ec.start[resolved]
+        end = ec.end[resolved]
+        by_start = np.argsort(start, kind="stable")
+        pair_keys = parent * len(nc) + child
+        order = by_start[np.argsort(pair_keys[by_start], kind="stable")]
+        pair_keys = pair_keys[order]
+        new_pair = np.ones(len(order), dtype=bool)
+        new_pair[1:] = pair_keys[1:] != pair_keys[:-1]
+        positions, ranks = np.unique(np.concatenate([start[order], end[order]]), return_inverse=True)
+        reach = _running_max_by_group(pair_keys, ranks[len(order):], len(positions))
+        overlaps = np.zeros(len(order), dtype=bool)
+        overlaps[1:] = ~new_pair[1:] & (ranks[1:len(order)] < reach[:-1])
+
+        return ValidationReport(
+            missing_endpoints=np.flatnonzero(~resolved),
+            unconnected_nodes=nc.id[~connected],
+            empty_nodes=nc.id[nc.start >= nc.end],
+            inverted_edges=resolved_rows[nc.height[parent] <= nc.height[child]],
+            edges_outside_nodes=resolved_rows[outside],
+            overlapping_edges=np.sort(resolved_rows[order[overlaps]])
+        )
+
+    def coalesce_edges(self, rows=None):
+        """
+        Merge edges with the same parent and child whose [start, end) spans
+        abut, e.g. where arg-needle-lib splits one relationship over several
+        edges, into a single edge per contiguous run. This is lossless apart
+        from the redundant breakpoints. Returns number of edges removed.
+
+        If edge rows are given, only edges between the same parents and
+        children as those rows are considered, e.g. edges added since an
+        already coalesced update.
+        """
+        self._check_not_frozen()
+        ec = self.edge_columns
+        if rows is None:
+            candidates = np.arange(len(ec))
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            candidates = np.flatnonzero(
+                np.isin(ec.parent_id, ec.parent_id[rows]) &
+                np.isin(ec.child_id, ec.child_id[rows])
+            )
+        if len(candidates) < 2:
+            return 0
+
+        # Sort by pair then start, so runs to merge are adjacent
+        order = candidates[np.lexsort((
+            ec.start[candidates],
+            ec.child_id[candidates],
+            ec.parent_id[candidates]
+        ))]
+        parent_id = ec.parent_id[order]
+        child_id = ec.child_id[order]
+        start = ec.start[order]
+        end = ec.end[order]
+        continues_run = (
+            (parent_id[1:] == parent_id[:-1]) &
+            (child_id[1:] == child_id[:-1]) &
+            (start[1:] == end[:-1])
+        )
+        removed = int(np.count_nonzero(continues_run))
+        if not removed:
+            return 0
+
+        # First edge of each run takes the end of the run's last edge
+        run_first = np.flatnonzero(np.concatenate([[True], ~continues_run]))
+        run_last = np.concatenate([run_first[1:], [len(order)]]) - 1
+        ec.end[order[run_first]] = end[run_last]
+        keep = np.ones(len(ec), dtype=bool)
+        keep[order] = False
+        keep[order[run_first]] = True
+        ec.compress(keep)
+
+        # Rows have moved, so pending changes are superseded by a full update
+        self._pending_edges.clear()
+        self._touched_nodes.clear()
+        self.invalidate()
+        return removed
+
+    def content_hash(self):
+        """
+        SHA-256 of node and edge data, excluding derived layout, so identical
+        graphs hash the same regardless of how they were built
+        """
+        nc = self.node_columns
+        ec = self.edge_columns
+        digest = hashlib.sha256()
+        for column in (nc.id, nc.height, nc.start, nc.end, ec.parent_id, ec.child_id, ec.start, ec.end):
+            digest.update(np.ascontiguousarray(column).data)
+        return digest.hexdigest()
+
+    def save(self, filename, source_key: str=""):
+        """
+        Save nodes, edges and computed layout to an uncompressed .npz file so
+        they can be reloaded, or memory-mapped, without conversion or layout.
+        source_key identifies what the info was built from, e.g. a simulation
+        seed or ARG file hash, and is checked on load to detect stale files.
+        """
+        settings, arrays = self._snapshot()
+        metadata = {
+            "format_version": SAVE_FORMAT_VERSION,
+            "source_key": source_key,
+            "content_hash": self.content_hash(),
+            **settings,
+        }
+        arrays["metadata"] = np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8)
+
+        with open(filename, "wb") as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, filename, mmap=False, source_key: str=None, verify=False):
+        """
+        Load ArgRenderInfo saved by save(), ready to render with no update.
+        With mmap, arrays are memory-mapped copy-on-write so only pages that
+        are touched are read. Raises ValueError if the file format or
+        source_key do not match, or if verify is set and the content hash of
+        loaded data differs from that saved.
+        """
+        arrays = _load_npz(filename, mmap)
+        metadata = json.loads(bytes(arrays.pop("metadata")).decode())
+        if metadata["format_version"] != SAVE_FORMAT_VERSION:
+            raise ValueError(f"{filename}: unsupported format version {metadata['format_version']}")
+        if source_key is not None and metadata["source_key"] != source_key:
+            raise ValueError(f"{filename}: stale, built from {metadata['source_key']!r} not {source_key!r}")
+
+        ri = cls._from_snapshot(metadata, arrays)
+        if verify and ri.content_hash() != metadata["content_hash"]:
+            raise ValueError(f"{filename}: content hash mismatch")
+        return ri
+
+    def publish(self):
+        """
+        Copy nodes, edges and computed layout into a new shared memory block,
+        returning a SharedRenderInfo handle that other processes can pass to
+        attach() to use the arrays without copying
+        """
+        return SharedRenderInfo(*self._snapshot())
+
+    @classmethod
+    def attach(cls, shared: SharedRenderInfo):
+        """
+        Frozen ArgRenderInfo whose arrays are read-only views of a block
+        published by publish(), ready to render with no update. Methods that
+        would change nodes or edges raise ValueError. The block stays open
+        for as long as the returned info.
+        """
+        block = shared_memory.SharedMemory(name=shared.name)
+        arrays = {}
+        for name, dtype, shape, offset in shared.layout:
+            array = np.ndarray(shape, dtype, block.buf, offset)
+            array.flags.writeable = False
+            arrays[name] = array
+
+        ri = cls._from_snapshot(shared.settings, arrays)
+        ri.frozen = True
+        ri._shared_memory = block
+        return ri
+
+    def _snapshot(self):
+        """
+        Settings and arrays needed to rebuild this info via _from_snapshot()
+        """
+        self._update_if_dirty()
+        settings = {
+            "quantise": self.quantise,
+            "coalesce": self.coalesce,
+            "window": list(map(float, self.window)) if self.window else None,
+        }
+        arrays = {}
+        for prefix, store in (("node_", self.node_columns), ("edge_", self.edge_columns)):
+            for name in store._dtypes:
+                arrays[prefix + name] = getattr(store, name)
+        arrays["id_order"] = self._id_order
+        arrays["sorted_ids"] = self._sorted_ids
+        arrays["breakpoint_positions"] = self.breakpoint_positions
+        return settings, arrays
+
+    @classmethod
+    def _from_snapshot(cls, settings, arrays):
+        window = settings["window"] and tuple(settings["window"])
+        ri = cls(quantise=settings["quantise"], window=window, coalesce=settings.get("coalesce", False))
+        ri.clear()
+        for prefix, store in (("node_", ri.node_columns), ("edge_", ri.edge_columns)):
+            store.assign({name: arrays[prefix + name] for name in store._dtypes})
+        ri._id_order = arrays["id_order"]
+        ri._sorted_ids = arrays["sorted_ids"]
+        ri._check_dense_ids()
+        ri.breakpoint_positions = arrays["breakpoint_positions"]
+        ri._full_update_needed = False
+        ri.dirty = False
+        return ri
+
+    def _check_not_frozen(self):
+        if self.frozen:
+            raise ValueError("ArgRenderInfo is frozen, e.g. attached from shared memory")
+
+    @classmethod
+    def cached(cls, cache_dir, source_key: str, build, mmap=False):
+        """
+        Load ArgRenderInfo from cache_dir if a file for source_key exists,
+        otherwise call build() to create it and save to cache. Files are named
+        by hash of source_key, so keys should capture everything the info
+        depends on, e.g. simulation parameters and layout options.
+        """
+        key_hash = hashlib.sha256(source_key.encode()).hexdigest()[:16]
+        filename = Path(cache_dir) / f"{key_hash}.npz"
+        if filename.exists():
+            try:
+                return cls.load(filename, mmap=mmap, source_key=source_key)
+            except (ValueError, KeyError, OSError, zipfile.BadZipFile):
+                pass
+
+        ri = build()
+        filename.parent.mkdir(exist_ok=True, parents=True)
+        ri.save(filename, source_key)
+        return ri
+
+    def invalidate(self):
+        """
+        Force next update() to rebuild all lookups and layout, e.g. after
+        columns have been modified directly
+        """
+        self._check_not_frozen()
+        self._full_update_needed = True
+        self.dirty = True
+
+    def node_indices(self, ids):
+        """
+        Row index of node for given id or array of ids, -1 where not found
+        """
+        ids = np.asarray(ids)
+        if not len(self._sorted_ids):
+            return np.full(ids.shape, -1, dtype=np.int64)
+        if self._dense_ids:
+            # Ids are 0..n-1 in row order, as from arg-needle-lib or tskit
+            found = (ids >= 0) & (ids < len(self._sorted_ids))
+            return np.where(found, ids, -1)
+        pos = np.searchsorted(self._sorted_ids, ids)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == ids
+        return np.where(found, self._id_order[pos], -1)
+
+    def edges_at(self, pos: float):
+        """
+        Sorted row indices of edges whose [start, end) span covers genome
+        position pos, found via an interval index over breakpoints in
+        O(log breakpoints + edges found)
+        """
+        self._update_if_dirty()
+        if self._interval_index is None:
+            self._build_interval_index()
+        order, indptr, leaf_offset = self._interval_index
+
+        interval = np.searchsorted(self.breakpoint_positions, pos, side="right") - 1
+        if interval < 0 or interval >= len(self.breakpoint_positions) - 1:
+            return np.empty(0, dtype=np.int64)
+
+        # Edges are stored on the tree nodes covering their intervals, so
+        # those covering pos are on the path from its leaf to the root
+        tree_nodes = (leaf_offset + interval) >> np.arange(leaf_offset.bit_length())
+        return np.sort(order[_csr_gather(indptr, tree_nodes)])
+
+    def local_tree(self, pos: float):
+        """
+        Marginal tree at genome position pos as dict of child id to parent id
+        """
+        rows = self.edges_at(pos)
+        ec = self.edge_columns
+        return dict(zip(ec.child_id[rows].tolist(), ec.parent_id[rows].tolist()))
+
+    def child_rows(self, row):
+        """
+        Row indices of distinct child nodes of node at given row, or of all
+        given rows concatenated
+        """
+        children, children_indptr, _, _ = self._csr_adjacency()
+        return children[_csr_gather(children_indptr, np.atleast_1d(row))]
+
+    def parent_rows(self, row):
+        """
+        Row indices of distinct parent nodes of node at given row, or of all
+        given rows concatenated
+        """
+        _, _, parents, parents_indptr = self._csr_adjacency()
+        return parents[_csr_gather(parents_indptr, np.atleast_1d(row))]
+
+    @property
+    def node_role(self):
+        return self.node_columns.role
+
+    @property
+    def leaf_nodes(self):
+        return self._nodes_with_role(ROLE_LEAF)
+
+    @property
+    def root_nodes(self):
+        return self._nodes_with_role(ROLE_ROOT)
+
+    @property
+    def interior_nodes(self):
+        return self._nodes_with_role(ROLE_INTERIOR)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by node and edge storage and lookup arrays
+        """
+        arrays = [
+            self._id_order,
+            self._sorted_ids,
+            self.breakpoint_positions
+        ]
+        return (
+            self.node_columns.nbytes +
+            self.edge_columns.nbytes +
+            sum(array.nbytes for array in arrays)
+        )
 
     def node_is_leaf(self, node):
-        return node in self.leaf_nodes
+        return self.node_role[node.index] == ROLE_LEAF
 
     def node_is_root(self, node):
-        return node in self.root_nodes
+        return self.node_role[node.index] == ROLE_ROOT
 
     def node_is_interior(self, node):
-        return node in self.interior_nodes
+        return self.node_role[node.index] == ROLE_INTERIOR
+
+    def _nodes_with_role(self, role):
+        return [self.nodes[index] for index in np.flatnonzero(self.node_role == role)]
 
     def _clear_maps(self):
-        self.node_by_id = {}
-        self.edges_by_child_node_id = {}
-        self.leaf_nodes = set()
-        self.interior_nodes = set()
-        self.root_nodes = set()
-        self.breakpoint_positions = set()
-        self.node_children = {}
-        self.nodes_by_depth = {}
+        empty_index = np.empty(0, dtype=np.int64)
+        self._id_order = empty_index
+        self._sorted_ids = empty_index
+        self._dense_ids = False
+        self.breakpoint_positions = np.empty(0, dtype=np.float64)
+        self._interval_index = None
+        self._adjacency = None
+
+        # Changes since last update, as node and edge row indices
+        self._pending_nodes = set()
+        self._pending_edges = set()
+        self._touched_nodes = set()
+        self._breakpoints_dirty = False
+        self._full_update_needed = True
+
+        # Per-node Counters of adjacent node rows, only built once an
+        # incremental update needs them, see _AdjacencyCounters
+        self._children = None
+        self._parents = None
+
+    def _in_window(self, start, end):
+        window_start, window_end = self.window
+        return (start < window_end) & (end > window_start)
+
+    def _clip_to_window(self, start, end):
+        window_start, window_end = self.window
+        return np.maximum(start, window_start), np.minimum(end, window_end)
+
+    def _drop_nodes_outside_window(self):
+        """
+        Drop nodes that have no edges left in window, or if there are no edges
+        at all, those whose span misses the window
+        """
+        nc = self.node_columns
+        ec = self.edge_columns
+        if len(ec):
+            keep = np.isin(nc.id, ec.parent_id) | np.isin(nc.id, ec.child_id)
+        else:
+            keep = nc.start < nc.end
+        if not np.all(keep):
+            nc.compress(keep)
+
+    def _csr_adjacency(self):
+        """
+        Compressed sparse row indexes over node rows from distinct parent and
+        child pairs: children of row r are children[children_indptr[r]:
+        children_indptr[r + 1]], and likewise for parents. Built with the full
+        layout and lazily after incremental updates. Edges referencing
+        unknown nodes are ignored.
+        """
+        if self._adjacency is not None:
+            return self._adjacency
+
+        ec = self.edge_columns
+        node_count = len(self.node_columns)
+        valid = (ec.parent_index >= 0) & (ec.child_index >= 0)
+
+        # Sorted unique pair keys are already grouped by parent
+        pair_keys = np.unique(ec.parent_index[valid] * node_count + ec.child_index[valid])
+        pair_parents = pair_keys // node_count
+        children = pair_keys % node_count
+        children_indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_parents, minlength=node_count), out=children_indptr[1:])
+
+        parent_order, parents_indptr = _csr_index(children, node_count)
+        self._adjacency = (children, children_indptr, pair_parents[parent_order], parents_indptr)
+        return self._adjacency
+
+    def _build_interval_index(self):
+        """
+        Segment tree over the elementary intervals between breakpoints, held
+        as a CSR index from tree node to edge rows. Each edge is stored on the
+        O(log n) nodes whose ranges exactly cover its span, in heap order with
+        leaves from leaf_offset.
+        """
+        ec = self.edge_columns
+        interval_count = max(len(self.breakpoint_positions) - 1, 1)
+        leaf_offset = 1 << (interval_count - 1).bit_length()
+        lo = np.searchsorted(self.breakpoint_positions, ec.start) + leaf_offset
+        hi = np.searchsorted(self.breakpoint_positions, ec.end) + leaf_offset
+        rows = np.arange(len(ec))
+
+        # Standard bottom-up decomposition of [lo, hi), for all edges at once
+        tree_nodes = []
+        edge_rows = []
+        while len(rows):
+            for take, node in ((lo & 1 == 1) & (lo < hi), lo), ((hi & 1 == 1) & (lo < hi), hi - 1):
+                tree_nodes.append(node[take])
+                edge_rows.append(rows[take])
+            lo = (lo + 1) >> 1
+            hi = hi >> 1
+            active = lo < hi
+            lo, hi, rows = lo[active], hi[active], rows[active]
+
+        tree_nodes = np.concatenate(tree_nodes) if tree_nodes else np.empty(0, dtype=np.int64)
+        edge_rows = np.concatenate(edge_rows) if edge_rows else np.empty(0, dtype=np.int64)
+        order, indptr = _csr_index(tree_nodes, 2 * leaf_offset)
+        self._interval_index = (edge_rows[order], indptr, leaf_offset)
+
+    def _check_dense_ids(self):
+        count = len(self._sorted_ids)
+        dense_range = np.arange(count)
+        self._dense_ids = (
+            count > 0 and
+            np.array_equal(self._sorted_ids, dense_range) and
+            np.array_equal(self._id_order, dense_range)
+        )
+
+    def _needs_full_update(self):
+        change_count = (
+            len(self._pending_nodes) +
+            len(self._pending_edges) +
+            len(self._touched_nodes)
+        )
+        size = len(self.nodes) + len(self.edges)
+        return (
+            self._full_update_needed or
+            self.quantise or
+            self.layout is not None or
+            self.window is not None or
+            change_count > size * INCREMENTAL_UPDATE_FRACTION
+        )
+
+    def _update_lookups(self):
+        if self.coalesce:
+            # Edges were coalesced by the last update, so only new edges may
+            # abut others, unless rebuilding all
+            rows = None if self._needs_full_update() else sorted(self._pending_edges)
+            self.coalesced_edge_count = self.coalesce_edges(rows)
+
+        full = self._needs_full_update()
+        if full:
+            self._update_full()
+        else:
+            self._update_incremental()
+
+        self._pending_nodes.clear()
+        self._pending_edges.clear()
+        self._touched_nodes.clear()
+        self._interval_index = None
+        if not full:
+            self._adjacency = None
+        self.dirty = False
+
+    def _update_full(self):
+        nc = self.node_columns
+        ec = self.edge_columns
+        if self.window:
+            self._drop_nodes_outside_window()
+
+        # Sorted id index for fast id to row lookups
+        self._id_order = np.argsort(nc.id, kind="stable")
+        self._sorted_ids = nc.id[self._id_order]
+        self._check_dense_ids()
+
+        ec.parent_index[:] = self.node_indices(ec.parent_id)
+        ec.child_index[:] = self.node_indices(ec.child_id)
+
+        # Parent/child adjacency over node rows, for layout and traversal
+        self._adjacency = None
+        _, children_indptr, _, parents_indptr = self._csr_adjacency()
+        is_parent = np.diff(children_indptr) > 0
+        is_child = np.diff(parents_indptr) > 0
+
+        # Parent and child usage informs basic leaf/root/internal
+        nc.role[:] = ROLE_INTERIOR
+        nc.role[~is_parent] = ROLE_LEAF
+        nc.role[is_parent & ~is_child] = ROLE_ROOT
+
+        # Sorted unique breakpoints from all edge spans
+        self.breakpoint_positions = np.unique(np.concatenate([ec.start, ec.end]))
+        self._breakpoints_dirty = False
+
+        # Adjacency is rebuilt from edge arrays if incremental updates follow
+        self._children = None
+        self._parents = None
+        self._full_update_needed = False
+
+        self._compute_x_pos_and_depth()
+
+    def _update_incremental(self):
+        nc = self.node_columns
+        ec = self.edge_columns
+        self._build_adjacency()
+        touched = self._touched_nodes
+
+        # Merge new node ids into sorted id index
+        new_nodes = np.array(sorted(self._pending_nodes), dtype=np.int64)
+        if len(new_nodes):
+            new_ids = nc.id[new_nodes]
+            id_order = np.argsort(new_ids, kind="stable")
+            new_ids = new_ids[id_order]
+            insert_pos = np.searchsorted(self._sorted_ids, new_ids, side="right")
+            self._sorted_ids = np.insert(self._sorted_ids, insert_pos, new_ids)
+            self._id_order = np.insert(self._id_order, insert_pos, new_nodes[id_order])
+
+            # Ids stay dense if appended in order, e.g. successive threading
+            # samples, which avoids an O(n) check
+            self._dense_ids = (
+                self._dense_ids and
+                np.array_equal(new_ids, new_nodes[id_order]) and
+                np.array_equal(new_ids, np.arange(new_ids[0], new_ids[0] + len(new_ids))) and
+                new_ids[0] == len(self._sorted_ids) - len(new_ids)
+            )
+            touched.update(new_nodes.tolist())
+
+        # Resolve new edge endpoints and link into adjacency
+        new_edges = np.array(sorted(self._pending_edges), dtype=np.int64)
+        if len(new_edges):
+            parent_index = self.node_indices(ec.parent_id[new_edges])
+            child_index = self.node_indices(ec.child_id[new_edges])
+            ec.parent_index[new_edges] = parent_index
+            ec.child_index[new_edges] = child_index
+
+            valid = (parent_index >= 0) & (child_index >= 0)
+            if not np.all(valid):
+                # Unknown endpoints may be added later, which only a full
+                # update re-resolves
+                self._full_update_needed = True
+            for parent, child in zip(parent_index[valid].tolist(), child_index[valid].tolist()):
+                self._link(parent, child)
+                touched.add(parent)
+                touched.add(child)
+
+            self.breakpoint_positions = np.union1d(
+                self.breakpoint_positions,
+                np.concatenate([ec.start[new_edges], ec.end[new_edges]])
+            )
+
+        if self._breakpoints_dirty:
+            self.breakpoint_positions = np.unique(np.concatenate([ec.start, ec.end]))
+            self._breakpoints_dirty = False
+
+        # Roles only change where edges were added or removed
+        for row in touched:
+            if row not in self._children:
+                nc.role[row] = ROLE_LEAF
+            elif row not in self._parents:
+                nc.role[row] = ROLE_ROOT
+            else:
+                nc.role[row] = ROLE_INTERIOR
+
+        if not self._update_depth_incremental(touched):
+            # A cycle was added, which the full layout leaves at depth -1
+            self._update_full()
+            return
+        self._update_x_pos_incremental(touched)
+
+    def _update_depth_incremental(self, touched):
+        """
+        Returns False if a cycle is found, as depth would then grow forever
+        """
+        # Depth is one above deepest child, so changes propagate up to parents
+        depth = self.node_columns.depth
+        max_depth = len(self.node_columns)
+        queue = deque(touched)
+        while queue:
+            row = queue.popleft()
+            children = self._children.get(row)
+            row_depth = 1 + max(depth[child] for child in children) if children else 0
+            if row_depth > max_depth:
+                return False
+            if row_depth != depth[row]:
+                depth[row] = row_depth
+                queue.extend(self._parents.get(row, ()))
+        return True
+
+    def _update_x_pos_incremental(self, touched):
+        nc = self.node_columns
+        depth = nc.depth
+        x_pos = nc.x_pos
+
+        # Leaves whose sort index changes move, as do their ancestors
+        leaf_rows = np.flatnonzero(nc.role == ROLE_LEAF)
+        leaf_x_pos = np.empty(len(leaf_rows))
+        leaf_x_pos[np.argsort(x_pos[leaf_rows], kind="stable")] = np.arange(len(leaf_rows))
+        moved_leaves = leaf_rows[x_pos[leaf_rows] != leaf_x_pos]
+        x_pos[leaf_rows] = leaf_x_pos
+
+        # Recompute averages in depth order so children are final before
+        # their parents are visited
+        queued = set(touched) | set(moved_leaves.tolist())
+        heap = [(depth[row], row) for row in queued]
+        heapq.heapify(heap)
+        while heap:
+            _, row = heapq.heappop(heap)
+            children = self._children.get(row)
+            if children:
+                row_x_pos = sum(x_pos[child] for child in children) / len(children)
+                changed = row_x_pos != x_pos[row]
+                x_pos[row] = row_x_pos
+            else:
+                changed = True
+
+            if changed or row in touched:
+                for parent in self._parents.get(row, ()):
+                    if parent not in queued:
+                        queued.add(parent)
+                        heapq.heappush(heap, (depth[parent], parent))
+
+    def _build_adjacency(self):
+        if self._children is not None:
+            return
+
+        ec = self.edge_columns
+        node_count = len(self.node_columns)
+        processed = np.ones(len(ec), dtype=bool)
+        processed[list(self._pending_edges)] = False
+        valid = processed & (ec.parent_index >= 0) & (ec.child_index >= 0)
+
+        # As _csr_adjacency(), but counting edges per pair
+        pair_keys, pair_counts = np.unique(
+            ec.parent_index[valid] * node_count + ec.child_index[valid],
+            return_counts=True
+        )
+        pair_parents = pair_keys // node_count
+        pair_children = pair_keys % node_count
+        children_indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_parents, minlength=node_count), out=children_indptr[1:])
+        parent_order, parents_indptr = _csr_index(pair_children, node_count)
+
+        self._children = _AdjacencyCounters(children_indptr, pair_children, pair_counts)
+        self._parents = _AdjacencyCounters(parents_indptr, pair_parents[parent_order], pair_counts[parent_order])
+
+    def _link(self, parent, child):
+        self._children.setdefault(parent, Counter())[child] += 1
+        self._parents.setdefault(child, Counter())[parent] += 1
+
+    def _unlink(self, parent, child):
+        for adjacency, row, other in ((self._children, parent, child), (self._parents, child, parent)):
+            counts = adjacency[row]
+            counts[other] -= 1
+            if not counts[other]:
+                del counts[other]
+            if not counts:
+                del adjacency[row]
+
+    def _remove_edge_row(self, row):
+        ec = self.edge_columns
+        if not self._full_update_needed and row not in self._pending_edges:
+            self._build_adjacency()
+            parent = ec.parent_index[row]
+            child = ec.child_index[row]
+            if parent >= 0 and child >= 0:
+                self._unlink(parent, child)
+                self._touched_nodes.add(parent)
+                self._touched_nodes.add(child)
+        self._pending_edges.discard(row)
+
+        moved = ec.swap_remove(row)
+        if moved != row and moved in self._pending_edges:
+            self._pending_edges.discard(moved)
+            self._pending_edges.add(row)
+
+        self._breakpoints_dirty = True
+        self.dirty = True
+
+    def _relabel_node_row(self, old_row, new_row):
+        """
+        Update id index, adjacency and edge endpoints after a node row moves
+        """
+        ec = self.edge_columns
+        self._id_order[self._id_order == old_row] = new_row
+        self._dense_ids = False
+        ec.parent_index[ec.parent_index == old_row] = new_row
+        ec.child_index[ec.child_index == old_row] = new_row
+        if old_row in self._touched_nodes:
+            self._touched_nodes.discard(old_row)
+            self._touched_nodes.add(new_row)
+
+        if self._children is None:
+            return
+        for adjacency, reverse in ((self._children, self._parents), (self._parents, self._children)):
+            counts = adjacency.pop(old_row, None)
+            if counts is None:
+                continue
+            adjacency[new_row] = counts
+            for other in counts:
+                reverse[other][new_row] = reverse[other].pop(old_row)
 
     def _compute_x_pos_and_depth(self):
         # In order to compute internal node positions, determine depth where 0
         # is start leaf nodes (x_pos known) and 1 is their immediate dependants
         # (x_pos averaged from parents), then onto 2, 3.. until all x_pos set
-        self.node_children = {}
+        nc = self.node_columns
+        depth = nc.depth
+        x_pos = nc.x_pos
+        children, children_indptr, parents, parents_indptr = self._csr_adjacency()
+
+        # Kahn-style topological pass from leaves upward, one frontier per
+        # depth: a node joins the frontier once all its children are
+        # consumed, so its depth is the longest path down to a leaf and each
+        # parent/child pair is visited once.
+        pending_children = np.diff(children_indptr)
+
+        depth[:] = -1
         max_compute_depth = 0
-        current_nodes = self.leaf_nodes
-        while current_nodes:
-            parent_nodes = set()
-            for node in current_nodes:
-                # Note this intentionally overwrites a previously-visted node
-                # depth if set; the maximal depth is what is needed
-                node.depth = max_compute_depth
-
-                # Collect parent nodes coming off this node for next iteration
-                parent_edges = self.edges_by_child_node_id.get(node.id, set())
-                for edge in parent_edges:
-                    parent_node = self.node_by_id[edge.parent_id]
-                    parent_nodes.add(parent_node)
-
-                    # Track any nodes to compute contribution to parent's x_pos
-                    self.node_children.setdefault(parent_node, set()).add(node)
+        current_nodes = np.flatnonzero(pending_children == 0)
+        while len(current_nodes):
+            depth[current_nodes] = max_compute_depth
+
+            # Consume pairs up from this frontier to find next one
+            frontier_parents = parents[_csr_gather(parents_indptr, current_nodes)]
+            frontier_parents, consumed = np.unique(frontier_parents, return_counts=True)
+            pending_children[frontier_parents] -= consumed
+            current_nodes = frontier_parents[pending_children[frontier_parents] == 0]
 
             # Move up to next layer
             max_compute_depth += 1
-            current_nodes = parent_nodes
-
-        self.nodes_by_depth = {}
-        for node in self.nodes:
-            self.nodes_by_depth.setdefault(
-                node.depth,
-                []
-            ).append(node)
-
-        if self.edges:
-            if self.nodes_by_depth:
-                # If the leaf node x positions have not been set - i.e. when working
-                # with manually-built structure not via build_from_arg - then set an
-                # arbitrary x pos for each.
-                if any([node.x_pos == None for node in self.nodes_by_depth[0]]):
-                    for new_id, node in enumerate(self.nodes_by_depth[0]):
-                        node.x_pos = new_id
+
+        # If the leaf node x positions have not been set - i.e. when working
+        # with manually-built structure not via build_from_arg - then set an
+        # arbitrary x pos for each.
+        leaf_mask = nc.role == ROLE_LEAF
+        if len(self.edges) and np.isnan(x_pos[leaf_mask]).any():
+            x_pos[leaf_mask] = np.arange(np.count_nonzero(leaf_mask))
+
+        # Re-sort leaf nodes so they are placed at their sort index, before
+        # parents are averaged from them. This keeps parents between their
+        # rendered children and matches incremental updates.
+        leaf_rows = np.flatnonzero(leaf_mask)
+        x_order = np.argsort(x_pos[leaf_rows], kind="stable")
+        x_pos[leaf_rows[x_order]] = np.arange(len(leaf_rows))
+
+        if len(self.edges):
+            # Distinct parent/child pairs contribute to parent's x_pos, sorted
+            # by parent depth so each layer is a contiguous slice
+            pair_parents = np.repeat(np.arange(len(nc)), np.diff(children_indptr))
+            pairs = np.stack([pair_parents, children], axis=1)
+            pairs = pairs[np.argsort(depth[pairs[:, 0]], kind="stable")]
+            layer_bounds = np.searchsorted(
+                depth[pairs[:, 0]],
+                np.arange(1, max_compute_depth + 1)
+            )
+
+            # Optional layout engine reorders leaves to reduce crossings
+            if self.layout:
+                x_pos[leaf_rows] = self.layout.leaf_x_pos(depth, x_pos, pairs, leaf_rows)
 
             # Ascend up compute stack to set each node's position as average of
             # contributors, i.e. ensure any parent (higher) nodes are rendered
             # inbeteen it's children (lower).
-            for compute_depth in range(1, max_compute_depth):
-                for node in self.nodes_by_depth[compute_depth]:
-                    contribs = self.node_children[node]
-                    contribs_x_pos = [contrib.x_pos for contrib in contribs]
-                    avg = sum(contribs_x_pos) / len(contribs)
-                    node.x_pos = avg
+            for lo, hi in zip(layer_bounds[:-1], layer_bounds[1:]):
+                layer_parents, inverse = np.unique(pairs[lo:hi, 0], return_inverse=True)
+                sums = np.bincount(inverse, weights=x_pos[pairs[lo:hi, 1]])
+                counts = np.bincount(inverse)
+                x_pos[layer_parents] = sums / counts
 
         # Optionally quantise locations so they are not fractional. For example,
         # a minimal 3 node graph with leaves at 0 and 1, would have parent at
         # 0.5. Quantise instead uses x_pos as sort order and then places at sort
         # index, so leaves at 0 and 2 with parent inbetween at 1.
         if self.quantise:
-            x_sorted_nodes = self.nodes.copy()
-        else:
-            # When not quantising all, just re-sort leaf nodes
-            x_sorted_nodes = list(self.leaf_nodes)
-        x_sorted_nodes.sort(key=lambda node: node.x_pos)
-        for index_pos, node in enumerate(x_sorted_nodes):
-            node.x_pos = index_pos
+            x_order = np.argsort(x_pos, kind="stable")
+            x_pos[x_order] = np.arange(len(x_pos))
 
 class RenderScale:
     def __init__(self, render_info: ArgRenderInfo, global_scale: float=10):
@@ -268,19 +1872,19 @@ class RenderScale:
         return h * self.height_scale
 
     def scale_len(self, len):
-        return len * self.len_scale
+        return (len - self.min_len) * self.len_scale
 
     def _compute_scale(self, render_info, global_scale):
-        max_height = 0
-        max_len = 0
-        for node in render_info.nodes:
-            max_height = max(max_height, node.height)
-            max_len = max(max_len, node.end)
-
-        self.max_height = max_height
-        self.max_len = max_len
-        self.max_width = max([node.x_pos for node in render_info.leaf_nodes])
+        nc = render_info.node_columns
+        self.max_height = float(np.max(nc.height, initial=0))
+        if render_info.window:
+            # Frame just the region of interest
+            self.min_len, self.max_len = map(float, render_info.window)
+        else:
+            self.min_len = 0.0
+            self.max_len = float(np.max(nc.end, initial=0))
+        self.max_width = float(np.max(nc.x_pos[render_info.node_role == ROLE_LEAF]))
 
         self.x_scale = global_scale / (self.max_width + 1)
         self.height_scale = global_scale / (self.max_height + 1)
-        self.len_scale = global_scale * 3 / (self.max_len + 1)
+        self.len_scale = global_scale * 3 / (self.max_len - self.min_len + 1)
@@ -0,0 +1,129 @@
+import numpy as np
+
+from arg_render_info import ArgRenderInfo
+
+# Initial cell resolution, halved until occupied cells fit the budget
+GENOME_BINS = 256
+X_BINS = 128
+DEPTH_BINS = 32
+
+
+class EdgeLod:
+    """
+    Level-of-detail stage between ArgRenderInfo and ArgToBlender for ARGs with
+    too many edges to render or read individually. Edges are binned by genome
+    position of their midpoint and by the depth and x position cells of both
+    endpoints, and each occupied bin becomes one quad with mean endpoints,
+    spanning its edges' genome extent. Cell resolution is halved until the
+    quad count fits `budget`. Edges intersecting an optional `focus` window
+    are kept at full detail.
+
+    Results are arrays of quads in layout units: child_x, child_height,
+    parent_x, parent_height, start and end, plus count of edges per quad.
+    """
+    def __init__(
+        self,
+        render_info: ArgRenderInfo,
+        budget: int = 20_000,
+        focus: tuple = None
+    ):
+        render_info.update()
+        self.budget = budget
+        self.focus = focus
+        self._compute_quads(render_info)
+
+    def __len__(self):
+        return len(self.count)
+
+    def _compute_quads(self, render_info):
+        nc = render_info.node_columns
+        ec = render_info.edge_columns
+        valid = (ec.parent_index >= 0) & (ec.child_index >= 0)
+        child = ec.child_index[valid]
+        parent = ec.parent_index[valid]
+        start = ec.start[valid]
+        end = ec.end[valid]
+
+        if self.focus:
+            focus_start, focus_end = self.focus
+            detail = (start < focus_end) & (end > focus_start)
+        else:
+            detail = np.zeros(len(start), dtype=bool)
+
+        # If everything fits, there is nothing to aggregate
+        aggregate_budget = max(self.budget - np.count_nonzero(detail), 1)
+        if len(start) - np.count_nonzero(detail) <= aggregate_budget:
+            detail[:] = True
+
+        quads = [
+            self._individual_quads(nc, child[detail], parent[detail], start[detail], end[detail]),
+        ]
+        aggregate = ~detail
+        if aggregate.any():
+            quads.append(self._aggregate_quads(
+                nc,
+                child[aggregate],
+                parent[aggregate],
+                start[aggregate],
+                end[aggregate],
+                aggregate_budget
+            ))
+
+        for name in quads[0]:
+            setattr(self, name, np.concatenate([quad[name] for quad in quads]))
+
+    @staticmethod
+    def _individual_quads(nc, child, parent, start, end):
+        return {
+            "child_x": nc.x_pos[child],
+            "child_height": nc.height[child],
+            "parent_x": nc.x_pos[parent],
+            "parent_height": nc.height[parent],
+            "start": start,
+            "end": end,
+            "count": np.ones(len(child), dtype=np.int64),
+        }
+
+    @staticmethod
+    def _aggregate_quads(nc, child, parent, start, end, budget):
+        depth = nc.depth
+        x_pos = nc.x_pos
+        min_len = start.min()
+        genome_span = max(end.max() - min_len, 1)
+        x_span = max(x_pos.max() + 1, 1)
+        depth_span = max(depth.max() + 1, 1)
+        midpoint = (start + end) / 2
+
+        genome_bins, x_bins, depth_bins = GENOME_BINS, X_BINS, DEPTH_BINS
+        while True:
+            dims = (genome_bins, depth_bins, x_bins, depth_bins, x_bins)
+            cells = (
+                np.minimum((midpoint - min_len) / genome_span * genome_bins, genome_bins - 1).astype(np.int64),
+                depth[child] * depth_bins // depth_span,
+                np.clip(x_pos[child] / x_span * x_bins, 0, x_bins - 1).astype(np.int64),
+                depth[parent] * depth_bins // depth_span,
+                np.clip(x_pos[parent] / x_span * x_bins, 0, x_bins - 1).astype(np.int64),
+            )
+            keys = np.ravel_multi_index(cells, dims)
+            bins, inverse, count = np.unique(keys, return_inverse=True, return_counts=True)
+            if len(bins) <= budget or dims == (1, 1, 1, 1, 1):
+                break
+            genome_bins = max(genome_bins // 2, 1)
+            x_bins = max(x_bins // 2, 1)
+            depth_bins = max(depth_bins // 2, 1)
+
+        # Mean endpoints and overall genome extent per bin
+        def mean(values):
+            return np.bincount(inverse, weights=values) / count
+
+        order = np.argsort(inverse, kind="stable")
+        bin_starts = np.concatenate([[0], np.cumsum(count)[:-1]])
+        return {
+            "child_x": mean(x_pos[child]),
+            "child_height": mean(nc.height[child]),
+            "parent_x": mean(x_pos[parent]),
+            "parent_height": mean(nc.height[parent]),
+            "start": np.minimum.reduceat(start[order], bin_starts),
+            "end": np.maximum.reduceat(end[order], bin_starts),
+            "count": count,
+        }
@@ -0,0 +1,145 @@
+"""
+Parallel rendering of many ARG frames, e.g. threading sequences, over a pool
+of worker processes that each keep their own bpy instance between frames
+"""
+import logging
+import multiprocessing
+
+from arg_render_info import ArgRenderInfo
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Per-worker Blender state, set up once by _init_worker
+_session = None
+
+# Shared flags set while each frame is rendering, so after a crash the
+# frames that were in flight can be told from those only queued
+_in_flight = None
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(resolution, in_flight):
+    global _session, _in_flight
+    _in_flight = in_flight
+    import bpy
+    from arg_to_blender import BlenderSession
+
+    if resolution:
+        bpy.context.scene.render.resolution_x, bpy.context.scene.render.resolution_y = resolution
+    _session = BlenderSession()
+
+
+def _render_frame(shared, png_out_file, render_args):
+    from arg_to_blender import ArgToBlender
+
+    ri = ArgRenderInfo.attach(shared)
+    ArgToBlender(ri, png_out_file=str(png_out_file), session=_session, **render_args)
+    return png_out_file
+
+
+def _render_tracked(render, i, *args):
+    # Render function is passed in, rather than called directly, so it is
+    # the one the scheduler submitted
+    _in_flight[i] = 1
+    try:
+        return render(*args)
+    finally:
+        _in_flight[i] = 0
+
+
+def render_frames(
+    frames: list,
+    processes: int = None,
+    retries: int = 2,
+    resolution: tuple = None,
+    **render_args
+):
+    """
+    Render (ArgRenderInfo, png_out_file) pairs in parallel, passing other
+    arguments on to ArgToBlender. Render info is published to shared memory
+    with ArgRenderInfo.publish() and attached, frozen, by workers without
+    copying. Frames that fail, including by crashing their worker, are
+    retried up to retries times. Returns PNG paths in frame order, with None
+    for frames that failed.
+    """
+    results = [None] * len(frames)
+    attempts = [0] * len(frames)
+    context = multiprocessing.get_context("spawn")
+    in_flight = context.Array("b", len(frames), lock=False)
+
+    def pool(processes):
+        return ProcessPoolExecutor(
+            processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(resolution, in_flight)
+        )
+
+    def submit(executor, i):
+        return executor.submit(_render_tracked, _render_frame, i, shared[i], frames[i][1], render_args)
+
+    def charge(i, e):
+        # True if frame may be retried
+        attempts[i] += 1
+        if attempts[i] > retries:
+            logger.warning(f"Frame {i} failed after {attempts[i]} attempts: {e!r}")
+            return False
+        return True
+
+    shared = [render_info.publish() for render_info, _ in frames]
+    try:
+        pending = list(range(len(frames)))
+        while pending:
+            failed = []
+            broken = []
+            with pool(processes) as executor:
+                futures = {submit(executor, i): i for i in pending}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except BrokenProcessPool as e:
+                        broken.append(i)
+                        broken_error = e
+                    except Exception as e:
+                        if charge(i, e):
+                            failed.append(i)
+
+            # A crashed worker breaks the pool, failing all outstanding
+            # frames. Those only queued go back to a full pool uncharged, and
+            # those in flight, one of which crashed, are isolated below.
+            suspects = [i for i in broken if in_flight[i]]
+            if broken and not suspects:
+                # Workers died before rendering anything, e.g. in setup, so
+                # charge every frame rather than retrying forever
+                failed += [i for i in broken if charge(i, broken_error)]
+            elif suspects:
+                failed += [i for i in broken if not in_flight[i]]
+            for i in broken:
+                in_flight[i] = 0
+
+            # Render suspects one at a time, so only a frame that crashes its
+            # worker is charged for it
+            executor = None
+            for i in sorted(suspects):
+                while results[i] is None:
+                    executor = executor or pool(1)
+                    try:
+                        results[i] = submit(executor, i).result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            executor.shutdown()
+                            executor = None
+                        if not charge(i, e):
+                            break
+                in_flight[i] = 0
+            if executor:
+                executor.shutdown()
+            pending = sorted(failed)
+    finally:
+        for block in shared:
+            block.close()
+            block.unlink()
+
+    return results
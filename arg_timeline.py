@@ -0,0 +1,228 @@
+import json
+import numpy as np
+
+from arg_render_info import ArgRenderInfo, _load_npz
+
+# Bumped whenever the Timeline file layout changes
+TIMELINE_FORMAT_VERSION = 1
+
+# Columns stored for each kind of per-frame change
+NODE_COLUMNS = ("id", "height", "start", "end", "x_pos")
+EDGE_COLUMNS = ("parent_id", "child_id", "start", "end")
+CHANGE_COLUMNS = {
+    "node_add": NODE_COLUMNS,
+    "node_remove": ("id",),
+    "node_move": ("id", "x_pos"),
+    "edge_add": EDGE_COLUMNS,
+    "edge_remove": EDGE_COLUMNS,
+}
+
+
+def _edge_keys(columns):
+    keys = np.empty(len(columns["parent_id"]), dtype=[(name, np.float64) for name in EDGE_COLUMNS])
+    for name in EDGE_COLUMNS:
+        keys[name] = columns[name]
+    return keys
+
+
+def _state_of(render_info):
+    """
+    Node and edge columns of render info as plain arrays, nodes sorted by id
+    """
+    render_info.update()
+    nc = render_info.node_columns
+    ec = render_info.edge_columns
+    order = np.argsort(nc.id, kind="stable")
+    nodes = {name: np.array(getattr(nc, name)[order]) for name in NODE_COLUMNS}
+    edges = {name: np.array(getattr(ec, name)) for name in EDGE_COLUMNS}
+    return nodes, edges
+
+
+class TimelineRecorder:
+    """
+    Records successive ArgRenderInfo states, e.g. each step of a threading
+    session, as deltas from the previous state: nodes and edges added or
+    removed and nodes whose x_pos changed. Every checkpoint_interval frames a
+    full state is stored instead, so any frame can be rebuilt by Timeline
+    from its nearest checkpoint without replaying the whole session.
+    """
+    def __init__(self, checkpoint_interval: int = 50):
+        self.checkpoint_interval = checkpoint_interval
+        self._changes = {group: [] for group in CHANGE_COLUMNS}
+        self._checkpoints = []
+        self._nodes = None
+        self._edges = None
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def record(self, render_info: ArgRenderInfo):
+        nodes, edges = _state_of(render_info)
+        checkpoint = len(self) % self.checkpoint_interval == 0
+        if checkpoint:
+            empty_nodes = {name: values[:0] for name, values in nodes.items()}
+            empty_edges = {name: values[:0] for name, values in edges.items()}
+            changes = self._diff(empty_nodes, empty_edges, nodes, edges)
+        else:
+            changes = self._diff(self._nodes, self._edges, nodes, edges)
+
+        for group, columns in changes.items():
+            self._changes[group].append(columns)
+        self._checkpoints.append(checkpoint)
+        self._nodes = nodes
+        self._edges = edges
+
+    def save(self, filename):
+        """
+        Save as uncompressed .npz of change columns concatenated over frames,
+        with an indptr per kind of change giving each frame's rows
+        """
+        metadata = {
+            "format_version": TIMELINE_FORMAT_VERSION,
+            "checkpoint_interval": self.checkpoint_interval,
+            "frame_count": len(self),
+        }
+        arrays = {
+            "metadata": np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8),
+            "checkpoint": np.array(self._checkpoints, dtype=bool),
+        }
+        for group, column_names in CHANGE_COLUMNS.items():
+            frames = self._changes[group]
+            counts = [len(frame[column_names[0]]) for frame in frames]
+            arrays[f"{group}_indptr"] = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+            for name in column_names:
+                values = [frame[name] for frame in frames]
+                arrays[f"{group}_{name}"] = np.concatenate(values) if values else np.empty(0)
+
+        with open(filename, "wb") as file:
+            np.savez(file, **arrays)
+
+    @staticmethod
+    def _diff(old_nodes, old_edges, nodes, edges):
+        added = ~np.isin(nodes["id"], old_nodes["id"])
+        removed = ~np.isin(old_nodes["id"], nodes["id"])
+
+        # Both id columns are sorted, so kept nodes line up in order
+        kept = ~added
+        old_x_pos = old_nodes["x_pos"][~removed]
+        new_x_pos = nodes["x_pos"][kept]
+        moved = ~((old_x_pos == new_x_pos) | (np.isnan(old_x_pos) & np.isnan(new_x_pos)))
+
+        old_keys = _edge_keys(old_edges)
+        keys = _edge_keys(edges)
+        edge_added = ~np.isin(keys, old_keys)
+        edge_removed = ~np.isin(old_keys, keys)
+
+        return {
+            "node_add": {name: values[added] for name, values in nodes.items()},
+            "node_remove": {"id": old_nodes["id"][removed]},
+            "node_move": {"id": nodes["id"][kept][moved], "x_pos": new_x_pos[moved]},
+            "edge_add": {name: values[edge_added] for name, values in edges.items()},
+            "edge_remove": {name: values[edge_removed] for name, values in old_edges.items()},
+        }
+
+
+class Timeline:
+    """
+    Recorded states loaded from a TimelineRecorder file. Frames are rebuilt
+    by applying changes from the nearest checkpoint at or before them, so
+    cost is bounded by the checkpoint interval rather than frame number.
+    """
+    def __init__(self, arrays, metadata):
+        self._arrays = arrays
+        self.checkpoint_interval = metadata["checkpoint_interval"]
+        self._checkpoint_frames = np.flatnonzero(arrays["checkpoint"])
+
+    def __len__(self):
+        return len(self._arrays["checkpoint"])
+
+    @classmethod
+    def load(cls, filename, mmap=False):
+        """
+        Load timeline saved by TimelineRecorder.save(), optionally memory
+        mapped. Raises ValueError if the file format does not match.
+        """
+        arrays = _load_npz(filename, mmap)
+        metadata = json.loads(bytes(arrays.pop("metadata")).decode())
+        if metadata["format_version"] != TIMELINE_FORMAT_VERSION:
+            raise ValueError(f"{filename}: unsupported format version {metadata['format_version']}")
+        return cls(arrays, metadata)
+
+    def frame(self, index: int, **render_info_args):
+        """
+        ArgRenderInfo for recorded frame. Extra arguments, e.g. window, are
+        passed to ArgRenderInfo. Nodes keep their recorded x positions unless
+        a layout or quantise is given, which lay out nodes afresh.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        start = self._checkpoint_frames[np.searchsorted(self._checkpoint_frames, index, side="right") - 1]
+        nodes = None
+        edges = None
+        for frame in range(start, index + 1):
+            nodes, edges = self._apply(frame, nodes, edges)
+
+        ri = ArgRenderInfo(**render_info_args)
+        if ri.window:
+            # Columns are assigned directly, so apply window as add_edge() and
+            # add_node() would
+            keep = ri._in_window(edges["start"], edges["end"])
+            edges = {name: values[keep] for name, values in edges.items()}
+            edges["start"], edges["end"] = ri._clip_to_window(edges["start"], edges["end"])
+            nodes = dict(nodes)
+            nodes["start"], nodes["end"] = ri._clip_to_window(nodes["start"], nodes["end"])
+
+        # Columns are used as-is, so update() overwrites x_pos in place
+        recorded_x_pos = np.array(nodes["x_pos"])
+        ri.node_columns.assign({
+            **nodes,
+            "depth": np.full(len(nodes["id"]), -1),
+            "role": np.zeros(len(nodes["id"])),
+        })
+        ri.edge_columns.assign({
+            **edges,
+            "parent_index": np.full(len(edges["parent_id"]), -1),
+            "child_index": np.full(len(edges["parent_id"]), -1),
+        })
+        ri.invalidate()
+        ri.update()
+
+        # Layout only derives recorded positions if leaf order matches, so
+        # restore them by id, as a window may have dropped nodes. A layout or
+        # quantising positions nodes itself instead.
+        if ri.layout is None and not ri.quantise:
+            rows = ri.node_indices(nodes["id"])
+            found = rows >= 0
+            ri.node_columns.x_pos[rows[found]] = recorded_x_pos[found]
+        return ri
+
+    def __getitem__(self, index):
+        return self.frame(index)
+
+    def _changes(self, group, frame):
+        indptr = self._arrays[f"{group}_indptr"]
+        rows = slice(indptr[frame], indptr[frame + 1])
+        return {name: self._arrays[f"{group}_{name}"][rows] for name in CHANGE_COLUMNS[group]}
+
+    def _apply(self, frame, nodes, edges):
+        if self._arrays["checkpoint"][frame]:
+            # Copied, as moves below write to node columns in place
+            nodes = {name: np.array(values) for name, values in self._changes("node_add", frame).items()}
+            return nodes, self._changes("edge_add", frame)
+
+        removed = np.isin(nodes["id"], self._changes("node_remove", frame)["id"])
+        added = self._changes("node_add", frame)
+        nodes = {name: np.concatenate([values[~removed], added[name]]) for name, values in nodes.items()}
+        order = np.argsort(nodes["id"], kind="stable")
+        nodes = {name: values[order] for name, values in nodes.items()}
+
+        moved = self._changes("node_move", frame)
+        nodes["x_pos"][np.searchsorted(nodes["id"], moved["id"])] = moved["x_pos"]
+
+        removed = np.isin(_edge_keys(edges), _edge_keys(self._changes("edge_remove", frame)))
+        added = self._changes("edge_add", frame)
+        edges = {name: np.concatenate([values[~removed], added[name]]) for name, values in edges.items()}
+        return nodes, edges
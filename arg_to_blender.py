@@ -1,13 +1,150 @@
 import bpy
+import json
 import math
 import mathutils
+import numpy as np
+import time
+import tracemalloc
 
-from arg_render_info import RenderScale, ArgRenderInfo
+from arg_render_info import RenderScale, ArgRenderInfo, ROLE_LEAF, ROLE_ROOT, ROLE_INTERIOR
+from arg_render_lod import EdgeLod
+from arg_to_mesh import (
+    LEAF_COLOUR,
+    ROOT_COLOUR,
+    INTERNAL_COLOUR,
+    OUTLINE_COLOUR,
+    EDGE_COLOUR,
+    edge_depth_colours,
+    edge_lod_colours
+)
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 
 HALF_PI = math.pi / 2
 NODE_COLOUR = (0.5, 1.0, 0.5, 0.5)
 SAMPLE_COLOUR = (0.1, 0.1, 1.0, 1.0)
-EDGE_COLOUR = (0.1, 0.1, 1.0, 0.3)
+
+# Maximum number of edges written into a single mesh in batched mode
+EDGE_BATCH_SIZE = 100_000
+
+@dataclass
+class LabelPolicy:
+    """
+    Level of detail for text labels, so label creation stays bounded on large
+    ARGs. Small ARGs below the thresholds are labelled in full.
+    """
+    node_threshold: int = 200          # Above this, only label leaves and roots, then every Nth
+    breakpoint_threshold: int = 100    # Above this, only label every Nth breakpoint
+    min_screen_spacing: float = 0      # Drop labels closer than this fraction of camera frame
+
+
+@dataclass
+class RenderProfile:
+    """
+    Render engine and quality settings applied before rendering, so preview
+    and final renders are consistent. Eevee samples are render samples, and
+    for Workbench pick the nearest anti-aliasing level, 1 being FXAA only.
+    Without blended transparency, materials use dithered transparency,
+    which is much cheaper and fine for previews.
+    """
+    engine: str = 'BLENDER_EEVEE_NEXT'
+    samples: int = 64
+    resolution_percentage: int = 100
+    persistent_data: bool = False
+    blended_transparency: bool = True
+
+
+# Named profiles selectable by ArgToBlender(render_profile=...). Preview
+# uses Workbench, drawing materials in flat solid colours, at half size.
+RENDER_PROFILES = {
+    "preview": RenderProfile(
+        engine='BLENDER_WORKBENCH',
+        samples=1,
+        resolution_percentage=50,
+        persistent_data=True,
+        blended_transparency=False
+    ),
+    "final": RenderProfile(),
+}
+
+# Workbench anti-aliasing levels, in samples
+WORKBENCH_AA_SAMPLES = (5, 8, 11, 16, 32)
+
+
+@dataclass
+class SceneStats:
+    """
+    Opt-in instrumentation of one ArgToBlender scene: wall time per phase in
+    seconds, bpy.data block counts on entry and on exit, blocks created by
+    this scene (counted from after clearing the previous one) and, if memory
+    was traced, peak Python allocation in bytes.
+    """
+    phases: dict = field(default_factory=dict)
+    datablocks_before: dict = field(default_factory=dict)
+    datablocks_after: dict = field(default_factory=dict)
+    datablocks_created: dict = field(default_factory=dict)
+    peak_memory: int = None
+
+    @property
+    def total_seconds(self):
+        return sum(self.phases.values())
+
+    def as_dict(self):
+        return {**vars(self), "total_seconds": self.total_seconds}
+
+
+class BlenderSession:
+    """
+    Blender state kept across successive ArgToBlender scenes, e.g. frames of
+    a threading sequence. Materials are created once and reused, and clearing
+    a scene removes the underlying meshes, curves and other datablocks rather
+    than just their objects, so memory stays flat over many frames.
+    """
+    # Datablock collections emptied between scenes, other than materials
+    CLEARED_DATA = ("objects", "meshes", "curves", "cameras", "lights", "node_groups", "actions")
+
+    def __init__(self):
+        self._materials = {}
+
+    def material(self, name, colour, attribute=None):
+        """
+        Get session material, creating it on first use. Materials are as
+        ArgToBlender._create_material_diffuse, or with colour and alpha from
+        a geometry colour attribute if one is given.
+        """
+        mat = self._materials.get(name)
+        if mat is not None:
+            try:
+                mat.name
+                return mat
+            except ReferenceError:
+                # Removed outside session, e.g. by a factory settings reset
+                pass
+
+        if attribute:
+            mat = ArgToBlender._create_material_attribute(name, attribute)
+        else:
+            mat = ArgToBlender._create_material_diffuse(name, *colour)
+        self._materials[name] = mat
+        return mat
+
+    def clear_scene(self):
+        """
+        Remove all objects and their data, including materials not owned by
+        this session, in a single batch
+        """
+        owned = set(self._materials.values())
+        doomed = [block for name in self.CLEARED_DATA for block in getattr(bpy.data, name)]
+        doomed += [mat for mat in bpy.data.materials if mat not in owned]
+        bpy.data.batch_remove(doomed)
+
+    @staticmethod
+    def datablock_counts():
+        return {
+            name: len(getattr(bpy.data, name))
+            for name in BlenderSession.CLEARED_DATA + ("materials", "images")
+        }
+
 
 class ArgToBlender:
     def __init__(
@@ -20,35 +157,124 @@ class ArgToBlender:
         render_breakpoints = True,
         text_scale = 0.5,
         camera_location=(-12, -8, 8),
-        camera_look_at=(-2, 6, 3)
+        camera_look_at=(-2, 6, 3),
+        batch_nodes = False,
+        batch_edges = False,
+        label_policy = None,
+        edge_lod: EdgeLod = None,
+        tree_positions = None,
+        session: BlenderSession = None,
+        stats = False,
+        trace_memory = False,
+        stats_log = None,
+        render_profile = "final"
     ):
+        """
+        render_profile is a RenderProfile or name from RENDER_PROFILES, e.g.
+        "preview" for fast low quality frames when debugging.
+
+        With stats, per-phase timings and datablock counts are recorded in a
+        SceneStats left in self.stats, otherwise None. trace_memory adds peak
+        Python memory via tracemalloc, which slows allocation-heavy phases.
+        If stats_log is a filename, stats are appended to it as a JSON line,
+        e.g. one per frame of a sequence.
+        """
+        self.render_profile = self._render_profile(render_profile)
+        self.stats = SceneStats() if stats else None
+        tracing = trace_memory and stats and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif trace_memory and stats:
+            tracemalloc.reset_peak()
+        if self.stats:
+            self.stats.datablocks_before = BlenderSession.datablock_counts()
+
         self.render_info = arg_render_info
-        if not render_scale:
-            render_scale = RenderScale(arg_render_info)
+        with self._phase("render_scale"):
+            if not render_scale:
+                render_scale = RenderScale(arg_render_info)
         self.render_scale = render_scale
+        self.label_policy = label_policy or LabelPolicy()
 
-        self._clear_default_scene_objects()
-        self._create_materials()
-        self._add_nodes_to_scene(render_text, text_scale)
-        self._add_edges_to_scene()
+        # Pass the same session to successive scenes to reuse materials
+        self.session = session or BlenderSession()
+        with self._phase("clear"):
+            self.session.clear_scene()
+        if self.stats:
+            cleared = BlenderSession.datablock_counts()
 
-        if render_text and render_breakpoints:
-            self._add_breakpoints_text_to_scene(text_scale)
+        with self._phase("materials"):
+            self._create_materials()
+        with self._phase("nodes"):
+            if batch_nodes:
+                self._add_nodes_to_scene_batched()
+            else:
+                self._add_nodes_to_scene()
+        with self._phase("edges"):
+            if tree_positions is not None:
+                self._add_tree_slices_to_scene(tree_positions)
+            elif edge_lod:
+                self._add_edge_lod_to_scene(edge_lod)
+            elif batch_edges:
+                self._add_edges_to_scene_batched()
+            else:
+                self._add_edges_to_scene()
+
+        # Labels follow camera so they may be culled in screen space
+        with self._phase("camera"):
+            self._create_camera(camera_location, camera_look_at)
+        if render_text:
+            with self._phase("labels"):
+                self._add_node_text_to_scene(text_scale)
+            if render_breakpoints:
+                with self._phase("breakpoints"):
+                    self._add_breakpoints_text_to_scene(text_scale)
+
+        # Counted before saving and rendering, which add images etc.
+        if self.stats:
+            after = BlenderSession.datablock_counts()
+            self.stats.datablocks_created = {name: after[name] - cleared[name] for name in after}
 
-        self._create_camera(camera_location, camera_look_at)
         if blender_out_file:
-            self._save_blender_file(blender_out_file)
+            with self._phase("save"):
+                self._save_blender_file(blender_out_file)
 
         if png_out_file:
-            self._save_render_image(png_out_file)
+            with self._phase("render"):
+                self._save_render_image(png_out_file, self.render_profile)
+
+        if self.stats:
+            self.stats.datablocks_after = BlenderSession.datablock_counts()
+            if trace_memory:
+                self.stats.peak_memory = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+            if stats_log:
+                with open(stats_log, "a") as file:
+                    file.write(json.dumps({"png_out_file": png_out_file, **self.stats.as_dict()}) + "\n")
+
+    @contextmanager
+    def _phase(self, name):
+        """
+        Record wall time of block under name in stats, if enabled
+        """
+        if not self.stats:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        self.stats.phases[name] = self.stats.phases.get(name, 0) + time.perf_counter() - start
 
     def _create_materials(self):
-        self.mat_leaf_node = self._create_material_diffuse("leaf", 0.2, 0.2, 1, 1)
-        self.mat_root_node = self._create_material_diffuse("root", 1, 0.2, 0.2, 1)
-        self.mat_internal_node = self._create_material_diffuse("internal", 0.2, 1, 0.2, 1)
-        self.mat_edge = self._create_material_diffuse("edge", 1, 1, 1, 0.1)
-        self.mat_outline = self._create_material_diffuse("outline", 0, 0, 0, 0.5)
-        self.mat_breakpoint = self._create_material_diffuse("breakpoint", 0.5, 0.5, 0.5, 1)
+        session = self.session
+        self.mat_leaf_node = session.material("leaf", LEAF_COLOUR)
+        self.mat_root_node = session.material("root", ROOT_COLOUR)
+        self.mat_internal_node = session.material("internal", INTERNAL_COLOUR)
+        self.mat_edge = session.material("edge", (1, 1, 1, 0.1))
+        self.mat_outline = session.material("outline", OUTLINE_COLOUR)
+        self.mat_breakpoint = session.material("breakpoint", (0.5, 0.5, 0.5, 1))
+        self.mat_edge_colour = session.material("edge_colour", None, attribute="colour")
+        self.mat_tree_slice = session.material("tree_slice", (1, 0.5, 0.1, 1))
 
     def _add_line(self, obj_name, radius, mat, x1, y1, z1, x2, y2, z2):
         line_point_list = ((x1, y1, z1, 0), (x2, y2, z2, 0))
@@ -67,7 +293,7 @@ class ArgToBlender:
         curvedata.materials.append(mat)
         curvedata.bevel_depth = radius
 
-    def _add_nodes_to_scene(self, render_text, text_scale):
+    def _add_nodes_to_scene(self):
         ri = self.render_info
         rs = self.render_scale
 
@@ -85,28 +311,99 @@ class ArgToBlender:
                 mat = self.mat_internal_node
             self._add_line(obj_name, 0.05, mat, x, s, h, x, e, h)
 
-            if render_text:
-                bpy.ops.object.text_add(
-                    location=(x, s - 0.1, h - 0.5),
-                    rotation=(HALF_PI, 0, 0),
-                    radius=text_scale
-                )
-                bpy.context.object.name = f"id_{node.id}"
-                bpy.context.object.data.body = f"{node.id}"
-                bpy.context.object.data.materials.append(mat)
+    def _add_nodes_to_scene_batched(self):
+        """
+        Write node lines as loose edges in one mesh per material class, filled
+        in bulk from node arrays, rather than a curve datablock per node. Lines
+        are thickened by a geometry nodes curve-to-tube modifier and each edge
+        carries a node_id attribute for picking.
+        """
+        ri = self.render_info
+        rs = self.render_scale
+        nc = ri.node_columns
+
+        x, h = rs.scale_xh(nc.x_pos, nc.height)
+        s = rs.scale_len(nc.start)
+        e = rs.scale_len(nc.end)
+        vtx = np.stack([
+            np.stack([x, s, h], axis=1),
+            np.stack([x, e, h], axis=1),
+        ], axis=1).astype(np.float32)
+
+        role_classes = [
+            ("leaf", ROLE_LEAF, self.mat_leaf_node),
+            ("root", ROLE_ROOT, self.mat_root_node),
+            ("internal", ROLE_INTERIOR, self.mat_internal_node),
+        ]
+        for name, role, mat in role_classes:
+            indices = np.flatnonzero(ri.node_role == role)
+            if not len(indices):
+                continue
+
+            obj_name = f"nodes_{name}"
+            mesh = self._create_line_mesh(f"{obj_name}_mesh", vtx[indices])
+            attr = mesh.attributes.new("node_id", 'INT', 'EDGE')
+            attr.data.foreach_set("value", nc.id[indices].astype(np.int32))
+
+            obj = bpy.data.objects.new(obj_name, mesh)
+            bpy.context.scene.collection.objects.link(obj)
+            modifier = obj.modifiers.new("tubes", 'NODES')
+            modifier.node_group = self._create_tube_node_group(
+                f"{obj_name}_tubes",
+                0.05,
+                mat
+            )
+
+    def _add_node_text_to_scene(self, text_scale):
+        ri = self.render_info
+        rs = self.render_scale
+        nc = ri.node_columns
+        policy = self.label_policy
+
+        # Leaves and roots take priority over interior nodes when culling
+        labelled = np.concatenate([
+            np.flatnonzero(ri.node_role == role)
+            for role in (ROLE_LEAF, ROLE_ROOT, ROLE_INTERIOR)
+        ])
+        if policy.node_threshold is not None and len(labelled) > policy.node_threshold:
+            labelled = labelled[ri.node_role[labelled] != ROLE_INTERIOR]
+        labelled = self._stride_to_budget(labelled, policy.node_threshold)
 
-                # FIXME reinstate optional height rendering
-                # bpy.ops.object.text_add(location=(x, e + text_scale, h), rotation=(0, 0, 0), radius=text_scale)
-                # bpy.context.object.name = f"height_{node.id}"
-                # bpy.context.object.data.body = f"{node.height:.3f}"
+        x, h = rs.scale_xh(nc.x_pos[labelled], nc.height[labelled])
+        s = rs.scale_len(nc.start[labelled])
+        locations = np.stack([x, s - 0.1, h - 0.5], axis=1)
+        keep = self._screen_spaced(locations, policy.min_screen_spacing)
+
+        role_mats = {
+            ROLE_LEAF: self.mat_leaf_node,
+            ROLE_ROOT: self.mat_root_node,
+            ROLE_INTERIOR: self.mat_internal_node,
+        }
+        for index, location in zip(labelled[keep], locations[keep]):
+            id = nc.id[index]
+            self._add_text(
+                f"id_{id}",
+                f"{id}",
+                location,
+                (HALF_PI, 0, 0),
+                text_scale,
+                role_mats[ri.node_role[index]]
+            )
+
+            # FIXME reinstate optional height rendering
+            # self._add_text(f"height_{id}", f"{nc.height[index]:.3f}", (x, e + text_scale, h), (0, 0, 0), text_scale, mat)
 
     def _add_edges_to_scene(self):
         ri = self.render_info
         rs = self.render_scale
+        ec = ri.edge_columns
 
-        for edge in ri.edges:
-            node = ri.node_by_id[edge.child_id]
-            parent = ri.node_by_id[edge.parent_id]
+        # Skip edges whose endpoints are not added yet, which have index -1
+        resolved = (ec.parent_index >= 0) & (ec.child_index >= 0)
+        for row in np.flatnonzero(resolved):
+            edge = ri.edges[row]
+            node = ri.nodes[ec.child_index[row]]
+            parent = ri.nodes[ec.parent_index[row]]
             x1, h1 = rs.scale_xh(node.x_pos, node.height)
             x2, h2 = rs.scale_xh(parent.x_pos, parent.height)
             s = rs.scale_len(edge.start)
@@ -134,20 +431,312 @@ class ArgToBlender:
             self._add_line(obj_name, 0.01, self.mat_outline, x1, s, h1, x2, s, h2)
             self._add_line(obj_name, 0.01, self.mat_outline, x1, e, h1, x2, e, h2)
 
+    def _add_edges_to_scene_batched(self):
+        """
+        Write all edge quads into as few meshes as possible using bulk
+        foreach_set calls rather than a mesh and two outline curves per edge.
+        Each face carries child_id and parent_id attributes for picking, and a
+        colour attribute blending from sample to root colour by depth.
+        """
+        ri = self.render_info
+        ec = ri.edge_columns
+        nc = ri.node_columns
+
+        # Skip edges whose endpoints are not added yet, which have index -1
+        rows = np.flatnonzero((ec.parent_index >= 0) & (ec.child_index >= 0))
+        child_index = ec.child_index[rows]
+        parent_index = ec.parent_index[rows]
+
+        self._add_quads_to_scene(
+            "edges",
+            nc.x_pos[child_index],
+            nc.height[child_index],
+            nc.x_pos[parent_index],
+            nc.height[parent_index],
+            ec.start[rows],
+            ec.end[rows],
+            edge_depth_colours(ri, rows),
+            child_id=ec.child_id[rows],
+            parent_id=ec.parent_id[rows]
+        )
+
+    def _add_edge_lod_to_scene(self, edge_lod):
+        """
+        Write aggregated edge quads from an EdgeLod, with colour and opacity
+        rising with the number of edges each quad stands for. Faces carry a
+        count attribute.
+        """
+        self._add_quads_to_scene(
+            "edges_lod",
+            edge_lod.child_x,
+            edge_lod.child_height,
+            edge_lod.parent_x,
+            edge_lod.parent_height,
+            edge_lod.start,
+            edge_lod.end,
+            edge_lod_colours(edge_lod),
+            count=edge_lod.count
+        )
+
+    def _add_tree_slices_to_scene(self, positions):
+        """
+        Instead of edge quads, draw the marginal tree at each genome position
+        as lines from child to parent in the plane at that position. Each tree
+        is its own object, so local trees can be stepped through by toggling
+        visibility rather than rebuilding the scene.
+        """
+        ri = self.render_info
+        rs = self.render_scale
+        ec = ri.edge_columns
+        nc = ri.node_columns
+
+        tube_group = self._create_tube_node_group("tree_slice_tubes", 0.02, self.mat_tree_slice)
+        for i, pos in enumerate(positions):
+            rows = ri.edges_at(pos)
+            rows = rows[(ec.parent_index[rows] >= 0) & (ec.child_index[rows] >= 0)]
+            if not len(rows):
+                continue
+
+            x1, h1 = rs.scale_xh(nc.x_pos[ec.child_index[rows]], nc.height[ec.child_index[rows]])
+            x2, h2 = rs.scale_xh(nc.x_pos[ec.parent_index[rows]], nc.height[ec.parent_index[rows]])
+            y = np.full(len(rows), rs.scale_len(pos))
+            vtx = np.stack([
+                np.stack([x1, y, h1], axis=1),
+                np.stack([x2, y, h2], axis=1),
+            ], axis=1).astype(np.float32)
+
+            obj_name = f"tree_{i}"
+            mesh = self._create_line_mesh(f"{obj_name}_mesh", vtx)
+            for attr_name in ("child_id", "parent_id"):
+                attr = mesh.attributes.new(attr_name, 'INT', 'EDGE')
+                attr.data.foreach_set("value", getattr(ec, attr_name)[rows].astype(np.int32))
+
+            obj = bpy.data.objects.new(obj_name, mesh)
+            obj["position"] = float(pos)
+            bpy.context.scene.collection.objects.link(obj)
+            modifier = obj.modifiers.new("tubes", 'NODES')
+            modifier.node_group = tube_group
+
+    def _add_quads_to_scene(self, name, x1, h1, x2, h2, start, end, colour, **face_attributes):
+        """
+        Bulk-write quads between (x1, h1) and (x2, h2) over [start, end), in
+        layout units, into meshes of at most EDGE_BATCH_SIZE faces. Colour and
+        integer face_attributes are per quad. Outlines are the start and end
+        edges of each quad, flagged with an outline attribute and thickened by
+        a geometry nodes modifier.
+        """
+        rs = self.render_scale
+        x1, h1 = rs.scale_xh(x1, h1)
+        x2, h2 = rs.scale_xh(x2, h2)
+        s = rs.scale_len(start)
+        e = rs.scale_len(end)
+
+        # Same vertex winding as per-edge quads, four vertices per edge
+        vtx = np.stack([
+            np.stack([x1, s, h1], axis=1),
+            np.stack([x1, e, h1], axis=1),
+            np.stack([x2, e, h2], axis=1),
+            np.stack([x2, s, h2], axis=1),
+        ], axis=1).astype(np.float32)
+
+        outline_group = self._create_tube_node_group(
+            f"{name}_outlines",
+            0.01,
+            self.mat_outline,
+            selection="outline"
+        )
+        for chunk_start in range(0, len(vtx), EDGE_BATCH_SIZE):
+            chunk = slice(chunk_start, chunk_start + EDGE_BATCH_SIZE)
+            obj_name = f"{name}_{chunk_start // EDGE_BATCH_SIZE}"
+            mesh = self._create_quad_mesh(f"{obj_name}_mesh", vtx[chunk])
+            for attr_name, values in face_attributes.items():
+                self._set_face_attribute(mesh, attr_name, 'INT', "value", values[chunk].astype(np.int32))
+            self._set_face_attribute(mesh, "colour", 'FLOAT_COLOR', "color", colour[chunk])
+            self._set_outline_attribute(mesh)
+
+            obj = bpy.data.objects.new(obj_name, mesh)
+            bpy.context.scene.collection.objects.link(obj)
+            obj.data.materials.append(self.mat_edge_colour)
+            modifier = obj.modifiers.new("outlines", 'NODES')
+            modifier.node_group = outline_group
+
+    @staticmethod
+    def _create_quad_mesh(name, vtx):
+        """
+        Mesh of one quad face per row of (n, 4, 3) vertex array
+        """
+        quad_count = len(vtx)
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(quad_count * 4)
+        mesh.vertices.foreach_set("co", vtx.ravel())
+        mesh.loops.add(quad_count * 4)
+        mesh.loops.foreach_set("vertex_index", np.arange(quad_count * 4, dtype=np.int32))
+        mesh.polygons.add(quad_count)
+        mesh.polygons.foreach_set("loop_start", np.arange(0, quad_count * 4, 4, dtype=np.int32))
+        mesh.update(calc_edges=True)
+        return mesh
+
+    @staticmethod
+    def _set_outline_attribute(mesh):
+        """
+        Flag quad start (0-3) and end (1-2) edges of a quad mesh as outlines
+        """
+        edge_vertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edge_vertices)
+        local = np.sort(edge_vertices.reshape(-1, 2) % 4, axis=1)
+        outline = (
+            ((local[:, 0] == 0) & (local[:, 1] == 3)) |
+            ((local[:, 0] == 1) & (local[:, 1] == 2))
+        )
+        attr = mesh.attributes.new("outline", 'BOOLEAN', 'EDGE')
+        attr.data.foreach_set("value", outline)
+
+    @staticmethod
+    def _set_face_attribute(mesh, name, type, prop, values):
+        attr = mesh.attributes.new(name, type, 'FACE')
+        attr.data.foreach_set(prop, np.ascontiguousarray(values).ravel())
+
+    @staticmethod
+    def _create_line_mesh(name, vtx):
+        """
+        Mesh of one loose edge per row of (n, 2, 3) vertex array
+        """
+        line_count = len(vtx)
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(line_count * 2)
+        mesh.vertices.foreach_set("co", vtx.ravel())
+        mesh.edges.add(line_count)
+        mesh.edges.foreach_set("vertices", np.arange(line_count * 2, dtype=np.int32))
+        mesh.update()
+        return mesh
+
+    @staticmethod
+    def _create_tube_node_group(name, radius, mat, selection=None):
+        """
+        Geometry nodes group that turns mesh edges into tubes of given radius
+        and material, joined with the input mesh. If selection is set, only
+        edges flagged by that boolean attribute are converted.
+        """
+        group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+        group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+        group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+        nodes = group.nodes
+        links = group.links
+
+        group_in = nodes.new("NodeGroupInput")
+        group_out = nodes.new("NodeGroupOutput")
+        to_curve = nodes.new("GeometryNodeMeshToCurve")
+        profile = nodes.new("GeometryNodeCurvePrimitiveCircle")
+        profile.inputs["Radius"].default_value = radius
+        to_mesh = nodes.new("GeometryNodeCurveToMesh")
+        set_mat = nodes.new("GeometryNodeSetMaterial")
+        set_mat.inputs["Material"].default_value = mat
+        join = nodes.new("GeometryNodeJoinGeometry")
+
+        if selection:
+            selected = nodes.new("GeometryNodeInputNamedAttribute")
+            selected.data_type = 'BOOLEAN'
+            selected.inputs["Name"].default_value = selection
+            links.new(selected.outputs["Attribute"], to_curve.inputs["Selection"])
+
+        links.new(group_in.outputs["Geometry"], to_curve.inputs["Mesh"])
+        links.new(to_curve.outputs["Curve"], to_mesh.inputs["Curve"])
+        links.new(profile.outputs["Curve"], to_mesh.inputs["Profile Curve"])
+        links.new(to_mesh.outputs["Mesh"], set_mat.inputs["Geometry"])
+        links.new(group_in.outputs["Geometry"], join.inputs["Geometry"])
+        links.new(set_mat.outputs["Geometry"], join.inputs["Geometry"])
+        links.new(join.outputs["Geometry"], group_out.inputs["Geometry"])
+
+        return group
+
     def _add_breakpoints_text_to_scene(self, text_scale):
         ri = self.render_info
         rs = self.render_scale
-        for breakpoint in ri.breakpoint_positions:
-            x, h, l = rs.scale_xhl(0, 0, breakpoint)
+        policy = self.label_policy
+
+        breakpoints = self._stride_to_budget(
+            ri.breakpoint_positions,
+            policy.breakpoint_threshold
+        )
+        x, h, l = rs.scale_xhl(0, 0, breakpoints)
+        locations = np.stack([
+            np.full(len(breakpoints), x - 0.2),
+            l + 0.5,
+            np.full(len(breakpoints), h - 0.5)
+        ], axis=1)
+        keep = self._screen_spaced(locations, policy.min_screen_spacing)
 
-            bpy.ops.object.text_add(
-                location=(x - 0.2, l + 0.5, h - 0.5),
-                rotation=(HALF_PI, 0, -HALF_PI),
-                radius=text_scale
+        for breakpoint, location in zip(breakpoints[keep].tolist(), locations[keep]):
+            self._add_text(
+                f"breakpoint_text_{breakpoint}",
+                str(breakpoint),
+                location,
+                (HALF_PI, 0, -HALF_PI),
+                text_scale,
+                self.mat_breakpoint
             )
-            bpy.context.object.name = f"breakpoint_text_{breakpoint}"
-            bpy.context.object.data.body = str(breakpoint)
-            bpy.context.object.data.materials.append(self.mat_breakpoint)
+
+    @staticmethod
+    def _add_text(obj_name, body, location, rotation, text_scale, mat):
+        """
+        Create text object via data API, avoiding per-label operator calls
+        and the scene updates they trigger. Returns the object, whose name
+        may differ from obj_name if that was taken.
+        """
+        curvedata = bpy.data.curves.new(name=obj_name, type='FONT')
+        curvedata.body = body
+        curvedata.size = text_scale
+        curvedata.materials.append(mat)
+
+        obj = bpy.data.objects.new(obj_name, curvedata)
+        obj.location = location
+        obj.rotation_euler = rotation
+        bpy.context.scene.collection.objects.link(obj)
+        return obj
+
+    @staticmethod
+    def _stride_to_budget(values, budget):
+        """
+        Every Nth value such that no more than budget remain
+        """
+        if budget is None or len(values) <= budget:
+            return values
+        return values[::math.ceil(len(values) / budget)]
+
+    @staticmethod
+    def _screen_spaced(locations, spacing):
+        """
+        Mask of label locations to keep so that no two are within spacing of
+        each other in camera frame, earlier locations taking priority. Labels
+        outside the frame are also dropped. Zero spacing keeps everything.
+        """
+        keep = np.ones(len(locations), dtype=bool)
+        if not spacing or not len(locations):
+            return keep
+
+        scene = bpy.context.scene
+        bpy.context.view_layer.update()
+        projection = scene.camera.calc_matrix_camera(
+            bpy.context.evaluated_depsgraph_get(),
+            x=scene.render.resolution_x,
+            y=scene.render.resolution_y,
+            scale_x=scene.render.pixel_aspect_x,
+            scale_y=scene.render.pixel_aspect_y
+        )
+        world_to_clip = np.array(projection @ scene.camera.matrix_world.inverted())
+        clip = np.c_[locations, np.ones(len(locations))] @ world_to_clip.T
+        in_front = clip[:, 3] > 0
+        ndc = clip[:, :2] / np.where(in_front, clip[:, 3], 1)[:, np.newaxis]
+        in_frame = in_front & np.all(np.abs(ndc) <= 1, axis=1)
+
+        # Normalised device coordinates span 2 units per frame, so first label
+        # in each grid cell of 2 * spacing is kept
+        cells = np.floor(ndc / (2 * spacing)).astype(np.int64)
+        cells = cells[in_frame]
+        _, first = np.unique(cells, axis=0, return_index=True)
+        keep[:] = False
+        keep[np.flatnonzero(in_frame)[first]] = True
+        return keep
 
     def _create_camera(self, camera_location, camera_look_at):
         rs = self.render_scale
@@ -157,14 +746,14 @@ class ArgToBlender:
         cam_obj = bpy.data.objects.new("Camera", cam)
         cam_obj.location = camera_location or (
             rs.max_width * 3 * rs.x_scale,
-            -rs.max_len * 0.3 * rs.len_scale,
+            -(rs.max_len - rs.min_len) * 0.3 * rs.len_scale,
             rs.max_height * 1.5 * rs.height_scale
         )
         bpy.context.scene.collection.objects.link(cam_obj)
 
         target = mathutils.Vector(camera_look_at or (
             0,
-            rs.max_len * 0.3 * rs.len_scale,
+            (rs.max_len - rs.min_len) * 0.3 * rs.len_scale,
             rs.max_height * 0.3 * rs.height_scale
         ))
         direction = target - cam_obj.location
@@ -184,23 +773,47 @@ class ArgToBlender:
         bpy.ops.wm.save_as_mainfile(filepath=filename)
 
     @staticmethod
-    def _save_render_image(filename):
+    def _render_profile(profile):
+        if isinstance(profile, str):
+            return RENDER_PROFILES[profile]
+        return profile
+
+    @staticmethod
+    def _apply_render_profile(profile):
+        scene = bpy.context.scene
+        scene.render.engine = profile.engine
+        scene.render.resolution_percentage = profile.resolution_percentage
+        scene.render.use_persistent_data = profile.persistent_data
+        if profile.engine == 'BLENDER_WORKBENCH':
+            # Flat material colours, alpha from material display colour
+            scene.display.shading.light = 'FLAT'
+            scene.display.shading.color_type = 'MATERIAL'
+            scene.display.render_aa = 'FXAA' if profile.samples <= 1 else str(next(
+                (aa for aa in WORKBENCH_AA_SAMPLES if aa >= profile.samples),
+                WORKBENCH_AA_SAMPLES[-1]
+            ))
+        else:
+            scene.eevee.taa_render_samples = profile.samples
+
+        method = 'BLENDED' if profile.blended_transparency else 'DITHERED'
+        for mat in bpy.data.materials:
+            mat.surface_render_method = method
+
+    @staticmethod
+    def _save_render_image(filename, profile=None):
+        if profile:
+            ArgToBlender._apply_render_profile(profile)
         bpy.context.scene.render.filepath = filename
         bpy.context.scene.render.film_transparent = True
         bpy.context.scene.render.image_settings.color_mode = 'RGBA'
         bpy.ops.render.render(write_still=True)
 
-    @staticmethod
-    def _clear_default_scene_objects():
-        bpy.ops.object.select_all(action='SELECT')
-        bpy.ops.object.delete()
-
     @staticmethod
     def _create_material_diffuse(name, r, g, b, a):
         mat = bpy.data.materials.new(name=name)
         mat.use_nodes = True
         mat.blend_method = 'BLEND'
-        mat.diffuse_color = (r, g, b, 1)
+        mat.diffuse_color = (r, g, b, a)
         nodes = mat.node_tree.nodes
         links = mat.node_tree.links
 
@@ -221,3 +834,241 @@ class ArgToBlender:
         links.new(mix.outputs["Shader"], output.inputs["Surface"])
 
         return mat
+
+    @staticmethod
+    def _create_material_attribute(name, attribute):
+        """
+        As _create_material_diffuse but with emission colour and alpha read
+        from a geometry colour attribute, e.g. per-face colours in batched
+        meshes.
+        """
+        # Display colour stands in for attribute colours in Workbench
+        mat = ArgToBlender._create_material_diffuse(name, *EDGE_COLOUR)
+        nodes = mat.node_tree.nodes
+        links = mat.node_tree.links
+
+        attr = nodes.new("ShaderNodeAttribute")
+        attr.attribute_type = 'GEOMETRY'
+        attr.attribute_name = attribute
+        links.new(attr.outputs["Color"], nodes["Emission"].inputs["Color"])
+        links.new(attr.outputs["Alpha"], nodes["Mix Shader"].inputs["Fac"])
+
+        return mat
+
+
+class ArgSequenceToBlender(ArgToBlender):
+    """
+    One scene animating a sequence of ArgRenderInfo states, e.g. successive
+    threading steps, instead of a scene per state. The scene holds the union
+    of all states' nodes and edges, with visibility keyframed per state and
+    node x positions keyframed so they move smoothly between layouts. Edge
+    quads are hooked to their nodes so follow them.
+
+    States are frame_step frames apart. Nodes are matched by id and edges by
+    ids and span; each node takes height, span and role from the last state
+    it appears in. Setting png_out_file renders all frames with a single
+    animation render, using it as the output path prefix.
+    """
+    def __init__(
+        self,
+        arg_render_infos: list,
+        render_scale = None,
+        png_out_file = None,
+        blender_out_file = None,
+        render_text = True,
+        text_scale = 0.5,
+        camera_location=(-12, -8, 8),
+        camera_look_at=(-2, 6, 3),
+        frame_step = 10,
+        session: BlenderSession = None,
+        render_profile = "final"
+    ):
+        self.render_profile = self._render_profile(render_profile)
+        states = list(arg_render_infos)
+        for state in states:
+            state.update()
+        self.render_info = states[-1]
+        if not render_scale:
+            render_scale = RenderScale(states[-1])
+        self.render_scale = render_scale
+
+        self.session = session or BlenderSession()
+        self.session.clear_scene()
+        self._create_materials()
+
+        frames = 1 + np.arange(len(states)) * frame_step
+        node_objs = self._add_animated_nodes(states, frames, render_text, text_scale)
+        self._add_animated_edges(states, frames, node_objs)
+        self._create_camera(camera_location, camera_look_at)
+
+        scene = bpy.context.scene
+        scene.frame_start = frames[0]
+        scene.frame_end = frames[-1]
+        scene.frame_set(frames[-1])
+
+        if blender_out_file:
+            self._save_blender_file(blender_out_file)
+
+        if png_out_file:
+            self._apply_render_profile(self.render_profile)
+            scene.render.filepath = png_out_file
+            scene.render.film_transparent = True
+            scene.render.image_settings.color_mode = 'RGBA'
+            bpy.ops.render.render(animation=True)
+
+    def _add_animated_nodes(self, states, frames, render_text, text_scale):
+        """
+        Node line objects keyed by id, placed at x by object location so it
+        can be keyframed. Returns objects in sorted id order.
+        """
+        rs = self.render_scale
+        ids = np.unique(np.concatenate([state.node_columns.id for state in states]))
+        present = np.zeros((len(states), len(ids)), dtype=bool)
+        x_pos = np.full((len(states), len(ids)), np.nan)
+        height = np.zeros(len(ids))
+        start = np.zeros(len(ids))
+        end = np.zeros(len(ids))
+        role = np.zeros(len(ids), dtype=np.int8)
+        for i, state in enumerate(states):
+            nc = state.node_columns
+            cols = np.searchsorted(ids, nc.id)
+            present[i, cols] = True
+            x_pos[i, cols] = nc.x_pos
+            height[cols] = nc.height
+            start[cols] = nc.start
+            end[cols] = nc.end
+            role[cols] = nc.role
+
+        # Hold position when absent, from previous state or else next one
+        for i in range(1, len(states)):
+            x_pos[i] = np.where(present[i], x_pos[i], x_pos[i - 1])
+        for i in range(len(states) - 2, -1, -1):
+            x_pos[i] = np.where(np.isnan(x_pos[i]), x_pos[i + 1], x_pos[i])
+        x = rs.scale_x(x_pos)
+        h = rs.scale_h(height)
+        s = rs.scale_len(start)
+        e = rs.scale_len(end)
+
+        role_mats = {
+            ROLE_LEAF: self.mat_leaf_node,
+            ROLE_ROOT: self.mat_root_node,
+            ROLE_INTERIOR: self.mat_internal_node,
+        }
+        tube_groups = {
+            role: self._create_tube_node_group(f"nodes_{role}_tubes", 0.05, mat)
+            for role, mat in role_mats.items()
+        }
+        node_objs = []
+        for col, id in enumerate(ids.tolist()):
+            obj_name = f"node_{id}"
+            vtx = np.array([[[0, s[col], h[col]], [0, e[col], h[col]]]], dtype=np.float32)
+            mesh = self._create_line_mesh(f"{obj_name}_mesh", vtx)
+            obj = bpy.data.objects.new(obj_name, mesh)
+            bpy.context.scene.collection.objects.link(obj)
+            modifier = obj.modifiers.new("tubes", 'NODES')
+            modifier.node_group = tube_groups[role[col]]
+            self._keyframe(obj, "location", frames, x[:, col], index=0)
+            self._keyframe_visibility(obj, frames, present[:, col])
+            node_objs.append(obj)
+
+            if render_text:
+                text_obj = self._add_text(
+                    f"id_{id}",
+                    f"{id}",
+                    (0, s[col] - 0.1, h[col] - 0.5),
+                    (HALF_PI, 0, 0),
+                    text_scale,
+                    role_mats[role[col]]
+                )
+                text_obj.parent = obj
+                self._keyframe_visibility(text_obj, frames, present[:, col])
+
+        return node_objs
+
+    def _add_animated_edges(self, states, frames, node_objs):
+        """
+        Edge quad objects, with child side vertices hooked to the child node
+        object and parent side to the parent, so they follow node moves
+        """
+        rs = self.render_scale
+        node_ids = np.unique(np.concatenate([state.node_columns.id for state in states]))
+        edge_dtype = [("parent_id", np.int64), ("child_id", np.int64), ("start", np.float64), ("end", np.float64)]
+
+        def edge_keys(state):
+            ec = state.edge_columns
+            keys = np.empty(len(ec), dtype=edge_dtype)
+            for name, _ in edge_dtype:
+                keys[name] = getattr(ec, name)
+            return keys
+
+        state_keys = [edge_keys(state) for state in states]
+        keys = np.unique(np.concatenate(state_keys))
+        present = np.zeros((len(states), len(keys)), dtype=bool)
+        for i, state_key in enumerate(state_keys):
+            present[i, np.searchsorted(keys, state_key)] = True
+
+        # Node heights are in node objects' meshes, which hold x at 0
+        child_objs = np.searchsorted(node_ids, keys["child_id"])
+        parent_objs = np.searchsorted(node_ids, keys["parent_id"])
+        s = rs.scale_len(keys["start"])
+        e = rs.scale_len(keys["end"])
+
+        outline_group = self._create_tube_node_group(
+            "edge_outlines",
+            0.01,
+            self.mat_outline,
+            selection="outline"
+        )
+        for col, key in enumerate(keys):
+            child_obj = node_objs[child_objs[col]]
+            parent_obj = node_objs[parent_objs[col]]
+            h1 = child_obj.data.vertices[0].co.z
+            h2 = parent_obj.data.vertices[0].co.z
+            vtx = np.array([[
+                (0, s[col], h1),
+                (0, e[col], h1),
+                (0, e[col], h2),
+                (0, s[col], h2),
+            ]], dtype=np.float32)
+
+            obj_name = f"edge_{key['child_id']}_{key['parent_id']}"
+            mesh = self._create_quad_mesh(f"{obj_name}_mesh", vtx)
+            self._set_outline_attribute(mesh)
+            obj = bpy.data.objects.new(obj_name, mesh)
+            bpy.context.scene.collection.objects.link(obj)
+            obj.data.materials.append(self.mat_edge)
+
+            for name, node_obj, vertices in (("child", child_obj, [0, 1]), ("parent", parent_obj, [2, 3])):
+                hook = obj.modifiers.new(name, 'HOOK')
+                hook.object = node_obj
+                hook.vertex_indices_set(vertices)
+            modifier = obj.modifiers.new("outlines", 'NODES')
+            modifier.node_group = outline_group
+            self._keyframe_visibility(obj, frames, present[:, col])
+
+    @staticmethod
+    def _keyframe(obj, data_path, frames, values, index=-1):
+        """
+        Key property, or one channel of it if index is set, to given values
+        at given frames
+        """
+        for frame, value in zip(frames.tolist(), values.tolist()):
+            if index >= 0:
+                getattr(obj, data_path)[index] = value
+            else:
+                setattr(obj, data_path, value)
+            obj.keyframe_insert(data_path, index=index, frame=frame)
+
+    @staticmethod
+    def _keyframe_visibility(obj, frames, visible):
+        if np.all(visible):
+            return
+        for data_path in ("hide_render", "hide_viewport"):
+            ArgSequenceToBlender._keyframe(obj, data_path, frames, ~visible)
+
+        # Switch visibility at each state rather than midway between them
+        for fcurve in obj.animation_data.action.fcurves:
+            if fcurve.data_path.startswith("hide_"):
+                for point in fcurve.keyframe_points:
+                    point.interpolation = 'CONSTANT'
+
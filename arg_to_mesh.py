@@ -0,0 +1,325 @@
+import json
+import numpy as np
+import struct
+
+from arg_render_info import RenderScale, ArgRenderInfo, ROLE_LEAF, ROLE_ROOT, ROLE_INTERIOR
+from arg_render_lod import EdgeLod
+
+# Material colours, shared with ArgToBlender
+LEAF_COLOUR = (0.2, 0.2, 1.0, 1.0)
+ROOT_COLOUR = (1.0, 0.2, 0.2, 1.0)
+INTERNAL_COLOUR = (0.2, 1.0, 0.2, 1.0)
+OUTLINE_COLOUR = (0.0, 0.0, 0.0, 0.5)
+EDGE_COLOUR = (0.1, 0.1, 1.0, 0.3)
+EDGE_ROOT_COLOUR = (1.0, 0.1, 0.1, 0.3)
+EDGE_DENSE_COLOUR = (1.0, 0.9, 0.2, 0.8)
+
+ROLE_COLOURS = {
+    ROLE_LEAF: ("leaf", LEAF_COLOUR),
+    ROLE_ROOT: ("root", ROOT_COLOUR),
+    ROLE_INTERIOR: ("internal", INTERNAL_COLOUR),
+}
+
+# glTF constants
+GLTF_FLOAT = 5126
+GLTF_UNSIGNED_INT = 5125
+GLTF_LINES = 1
+GLTF_TRIANGLES = 4
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def blend_colours(colour_from, colour_to, t):
+    """
+    Per-row RGBA colours blended linearly between two colours by t in [0, 1]
+    """
+    t = np.asarray(t)[:, np.newaxis]
+    return ((1 - t) * np.array(colour_from) + t * np.array(colour_to)).astype(np.float32)
+
+
+def edge_depth_colours(render_info: ArgRenderInfo, rows=None):
+    """
+    Edge colours blended from leaf to root colour by depth of child node, for
+    given edge rows or all edges. Rows should have resolved endpoints.
+    """
+    nc = render_info.node_columns
+    child_index = render_info.edge_columns.child_index
+    if rows is not None:
+        child_index = child_index[rows]
+    max_depth = max(int(np.max(nc.depth, initial=0)), 1)
+    t = nc.depth[child_index] / max_depth
+    return blend_colours(EDGE_COLOUR, EDGE_ROOT_COLOUR, t)
+
+
+def edge_lod_colours(edge_lod: EdgeLod):
+    """
+    Aggregated edge colours, brighter and more opaque with log edge count
+    """
+    t = np.log1p(edge_lod.count - 1) / max(np.log1p(edge_lod.count.max() - 1), 1)
+    return blend_colours(EDGE_COLOUR, EDGE_DENSE_COLOUR, t)
+
+
+class ArgToMesh:
+    """
+    Geometry for an ARG as plain NumPy vertex and index buffers, laid out as
+    ArgToBlender's batched mode, but without bpy so it can run anywhere, e.g.
+    exporting for a web viewer from CI. Coordinates are Blender's, z up.
+
+    Nodes are line segments, edges are quads of two triangles with per-vertex
+    colour, and edge outlines are line segments over the quads' vertices.
+    """
+    def __init__(
+        self,
+        render_info: ArgRenderInfo,
+        render_scale: RenderScale = None,
+        edge_lod: EdgeLod = None
+    ):
+        self.render_info = render_info
+        if not render_scale:
+            render_scale = RenderScale(render_info)
+        self.render_scale = render_scale
+
+        self._compute_nodes()
+        if edge_lod:
+            self._compute_edges(
+                edge_lod.child_x,
+                edge_lod.child_height,
+                edge_lod.parent_x,
+                edge_lod.parent_height,
+                edge_lod.start,
+                edge_lod.end,
+                edge_lod_colours(edge_lod)
+            )
+            self.edge_child_ids = None
+            self.edge_parent_ids = None
+            self.edge_counts = edge_lod.count
+        else:
+            ri = self.render_info
+            ec = ri.edge_columns
+            nc = ri.node_columns
+
+            # Skip edges whose endpoints are not added yet, which have index -1
+            rows = np.flatnonzero((ec.parent_index >= 0) & (ec.child_index >= 0))
+            child_index = ec.child_index[rows]
+            parent_index = ec.parent_index[rows]
+            self._compute_edges(
+                nc.x_pos[child_index],
+                nc.height[child_index],
+                nc.x_pos[parent_index],
+                nc.height[parent_index],
+                ec.start[rows],
+                ec.end[rows],
+                edge_depth_colours(ri, rows)
+            )
+            self.edge_child_ids = ec.child_id[rows]
+            self.edge_parent_ids = ec.parent_id[rows]
+            self.edge_counts = np.ones(len(rows), dtype=np.int64)
+
+    def _compute_nodes(self):
+        rs = self.render_scale
+        nc = self.render_info.node_columns
+
+        x, h = rs.scale_xh(nc.x_pos, nc.height)
+        s = rs.scale_len(nc.start)
+        e = rs.scale_len(nc.end)
+        self.node_vertices = np.stack([
+            np.stack([x, s, h], axis=1),
+            np.stack([x, e, h], axis=1),
+        ], axis=1).reshape(-1, 3).astype(np.float32)
+        self.node_lines = np.arange(len(nc) * 2, dtype=np.uint32).reshape(-1, 2)
+        self.node_roles = np.array(nc.role)
+        self.node_ids = np.array(nc.id)
+
+    def _compute_edges(self, x1, h1, x2, h2, start, end, colour):
+        rs = self.render_scale
+        x1, h1 = rs.scale_xh(x1, h1)
+        x2, h2 = rs.scale_xh(x2, h2)
+        s = rs.scale_len(start)
+        e = rs.scale_len(end)
+
+        # Same vertex winding as ArgToBlender quads, four vertices per edge
+        self.edge_vertices = np.stack([
+            np.stack([x1, s, h1], axis=1),
+            np.stack([x1, e, h1], axis=1),
+            np.stack([x2, e, h2], axis=1),
+            np.stack([x2, s, h2], axis=1),
+        ], axis=1).reshape(-1, 3).astype(np.float32)
+        self.edge_colours = np.repeat(colour, 4, axis=0)
+
+        first = np.arange(len(s), dtype=np.uint32)[:, np.newaxis] * 4
+        self.edge_quads = first + np.array([0, 1, 2, 3], dtype=np.uint32)
+        self.edge_triangles = (first + np.array([[0, 1, 2], [2, 3, 0]], dtype=np.uint32).reshape(1, 6)).reshape(-1, 3)
+        self.edge_outlines = (first + np.array([[0, 3], [1, 2]], dtype=np.uint32).reshape(1, 4)).reshape(-1, 2)
+
+    def write_gltf(self, filename):
+        """
+        Write binary glTF (.glb) with node lines per role, edge triangles with
+        vertex colours and edge outlines, using unlit materials matching
+        ArgToBlender's emission shaders. Converted to glTF's y up axes.
+        """
+        buffer = bytearray()
+        buffer_views = []
+        accessors = []
+
+        def add_accessor(array, type, target, bounds=False):
+            # Views are 4-byte aligned, which float32 and uint32 data keeps
+            array = np.ascontiguousarray(array)
+            buffer_views.append({
+                "buffer": 0,
+                "byteOffset": len(buffer),
+                "byteLength": array.nbytes,
+                "target": target,
+            })
+            buffer.extend(array.tobytes())
+            accessor = {
+                "bufferView": len(buffer_views) - 1,
+                "componentType": GLTF_FLOAT if array.dtype == np.float32 else GLTF_UNSIGNED_INT,
+                "count": len(array) if type != "SCALAR" else array.size,
+                "type": type,
+            }
+            if bounds:
+                accessor["min"] = array.min(axis=0).tolist()
+                accessor["max"] = array.max(axis=0).tolist()
+            accessors.append(accessor)
+            return len(accessors) - 1
+
+        def y_up(vertices):
+            return np.stack([vertices[:, 0], vertices[:, 2], -vertices[:, 1]], axis=1)
+
+        materials = []
+
+        def add_material(name, colour, blend=False):
+            materials.append({
+                "name": name,
+                "pbrMetallicRoughness": {"baseColorFactor": list(colour), "metallicFactor": 0},
+                "alphaMode": "BLEND" if blend or colour[3] < 1 else "OPAQUE",
+                "doubleSided": True,
+                "extensions": {"KHR_materials_unlit": {}},
+            })
+            return len(materials) - 1
+
+        meshes = []
+        if len(self.node_vertices):
+            node_positions = add_accessor(y_up(self.node_vertices), "VEC3", GLTF_ARRAY_BUFFER, bounds=True)
+            primitives = []
+            for role, (name, colour) in ROLE_COLOURS.items():
+                lines = self.node_lines[self.node_roles == role]
+                if not len(lines):
+                    continue
+                primitives.append({
+                    "attributes": {"POSITION": node_positions},
+                    "indices": add_accessor(lines.ravel(), "SCALAR", GLTF_ELEMENT_ARRAY_BUFFER),
+                    "mode": GLTF_LINES,
+                    "material": add_material(name, colour),
+                })
+            meshes.append({"name": "nodes", "primitives": primitives})
+
+        if len(self.edge_vertices):
+            edge_positions = add_accessor(y_up(self.edge_vertices), "VEC3", GLTF_ARRAY_BUFFER, bounds=True)
+            edge_colours = add_accessor(self.edge_colours, "VEC4", GLTF_ARRAY_BUFFER)
+            meshes.append({"name": "edges", "primitives": [
+                {
+                    "attributes": {"POSITION": edge_positions, "COLOR_0": edge_colours},
+                    "indices": add_accessor(self.edge_triangles.ravel(), "SCALAR", GLTF_ELEMENT_ARRAY_BUFFER),
+                    "mode": GLTF_TRIANGLES,
+                    "material": add_material("edge_colour", (1.0, 1.0, 1.0, 1.0), blend=True),
+                },
+                {
+                    "attributes": {"POSITION": edge_positions},
+                    "indices": add_accessor(self.edge_outlines.ravel(), "SCALAR", GLTF_ELEMENT_ARRAY_BUFFER),
+                    "mode": GLTF_LINES,
+                    "material": add_material("outline", OUTLINE_COLOUR),
+                },
+            ]})
+
+        gltf = {
+            "asset": {"version": "2.0", "generator": "arg-render"},
+            "extensionsUsed": ["KHR_materials_unlit"],
+            "scene": 0,
+            "scenes": [{"nodes": list(range(len(meshes)))}],
+            "nodes": [{"name": mesh["name"], "mesh": i} for i, mesh in enumerate(meshes)],
+            "meshes": meshes,
+            "materials": materials,
+            "accessors": accessors,
+            "bufferViews": buffer_views,
+            "buffers": [{"byteLength": len(buffer)}],
+        }
+
+        # GLB is a header then JSON and binary chunks, each 4-byte aligned
+        json_chunk = json.dumps(gltf, separators=(",", ":")).encode()
+        json_chunk += b" " * (-len(json_chunk) % 4)
+        buffer.extend(b"\0" * (-len(buffer) % 4))
+        with open(filename, "wb") as file:
+            file.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(json_chunk) + 8 + len(buffer)))
+            file.write(struct.pack("<I4s", len(json_chunk), b"JSON"))
+            file.write(json_chunk)
+            file.write(struct.pack("<I4s", len(buffer), b"BIN\0"))
+            file.write(buffer)
+
+    def write_ply(self, filename):
+        """
+        Write binary PLY with RGBA vertex colours, edge quads as faces
+        carrying child_id, parent_id and count properties, and node lines and
+        edge outlines as PLY edge elements
+        """
+        node_colours = np.zeros((len(self.node_vertices) // 2, 4), dtype=np.float32)
+        for role, (_, colour) in ROLE_COLOURS.items():
+            node_colours[self.node_roles == role] = colour
+        node_colours = np.repeat(node_colours, 2, axis=0)
+
+        vertex_offset = len(self.node_vertices)
+        vertices = np.empty(
+            vertex_offset + len(self.edge_vertices),
+            dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"),
+                   ("red", "u1"), ("green", "u1"), ("blue", "u1"), ("alpha", "u1")]
+        )
+        positions = np.concatenate([self.node_vertices, self.edge_vertices])
+        colours = np.concatenate([node_colours, self.edge_colours])
+        colours = np.round(np.clip(colours, 0, 1) * 255).astype(np.uint8)
+        for i, name in enumerate(("x", "y", "z")):
+            vertices[name] = positions[:, i]
+        for i, name in enumerate(("red", "green", "blue", "alpha")):
+            vertices[name] = colours[:, i]
+
+        quad_count = len(self.edge_quads)
+        missing_ids = np.full(quad_count, -1)
+        faces = np.empty(
+            quad_count,
+            dtype=[("count", "u1"), ("vertex_indices", "<i4", (4,)),
+                   ("child_id", "<i4"), ("parent_id", "<i4"), ("edge_count", "<i4")]
+        )
+        faces["count"] = 4
+        faces["vertex_indices"] = self.edge_quads + vertex_offset
+        faces["child_id"] = self.edge_child_ids if self.edge_child_ids is not None else missing_ids
+        faces["parent_id"] = self.edge_parent_ids if self.edge_parent_ids is not None else missing_ids
+        faces["edge_count"] = self.edge_counts
+
+        lines = np.concatenate([self.node_lines, self.edge_outlines + vertex_offset]).astype(np.int32)
+
+        header = "\n".join([
+            "ply",
+            "format binary_little_endian 1.0",
+            "comment arg-render, z up",
+            f"element vertex {len(vertices)}",
+            "property float x",
+            "property float y",
+            "property float z",
+            "property uchar red",
+            "property uchar green",
+            "property uchar blue",
+            "property uchar alpha",
+            f"element face {len(faces)}",
+            "property list uchar int vertex_indices",
+            "property int child_id",
+            "property int parent_id",
+            "property int edge_count",
+            f"element edge {len(lines)}",
+            "property int vertex1",
+            "property int vertex2",
+            "end_header",
+        ]) + "\n"
+        with open(filename, "wb") as file:
+            file.write(header.encode("ascii"))
+            file.write(vertices.tobytes())
+            file.write(faces.tobytes())
+            file.write(lines.tobytes())
@@ -0,0 +1,197 @@
+"""
+Benchmark of ARG conversion, layout, scene construction and rendering on
+seeded msprime ARGs over a grid of sample counts and sequence lengths
+
+Each stage is timed separately, taking the best of several repeats, and
+results are written as JSON. Pass --baseline with an earlier results file to
+flag stages that have become slower, e.g.
+
+    python benchmark.py --out baseline.json
+    python benchmark.py --baseline baseline.json --skip render_png
+"""
+import argparse
+import bpy
+import json
+import numpy as np
+import platform
+import sys
+import tempfile
+import time
+
+from arg_render_info import ArgRenderInfo, RenderScale
+from arg_to_blender import ArgToBlender, BlenderSession, RENDER_PROFILES
+from datetime import datetime, timezone
+from example_sim import arg_from_sim
+from pathlib import Path
+
+SAMPLE_COUNTS = [10, 100, 1_000]
+SEQ_LENS = [100_000, 1_000_000]
+POP_SIZE = 10_000
+RECOM = 2e-8
+MU = 2e-8
+SEED = 1234
+REPEATS = 3
+
+STAGES = [
+    "ingest",        # ArgRenderInfo from arg-needle-lib ARG, incl. first update
+    "update",        # Forced full update(), i.e. lookups, roles and layout
+    "render_scale",  # RenderScale
+    "scene_nodes",
+    "scene_edges",
+    "scene_labels",  # Camera plus node and breakpoint text
+    "save_blend",
+    "render_png",
+]
+
+# ArgToBlender stats phases summed into each scene stage
+SCENE_PHASES = {
+    "scene_nodes": ["nodes"],
+    "scene_edges": ["edges"],
+    "scene_labels": ["camera", "labels", "breakpoints"],
+    "save_blend": ["save"],
+    "render_png": ["render"],
+}
+
+# Stages are compared only when the baseline took at least this long, as
+# shorter timings are mostly noise
+MIN_COMPARED_SECONDS = 0.01
+
+
+def _time_stages(arg, scene_args, skip, out_dir):
+    """
+    Seconds taken by each stage for one pass over arg, and the render info
+    """
+    timings = {}
+
+    def timed(stage, run):
+        if stage in skip:
+            return None
+        start = time.perf_counter()
+        result = run()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    ri = timed("ingest", lambda: ArgRenderInfo(arg))
+
+    def full_update():
+        ri.invalidate()
+        ri.update()
+    timed("update", full_update)
+    rs = timed("render_scale", lambda: RenderScale(ri))
+
+    # Scene phases are timed by ArgToBlender itself
+    session = BlenderSession()
+    atb = ArgToBlender(
+        ri,
+        render_scale=rs,
+        png_out_file=None if "render_png" in skip else str(out_dir / "benchmark.png"),
+        blender_out_file=None if "save_blend" in skip else str(out_dir / "benchmark.blend"),
+        session=session,
+        stats=True,
+        **scene_args
+    )
+    session.clear_scene()
+    for stage, phases in SCENE_PHASES.items():
+        if stage not in skip and any(phase in atb.stats.phases for phase in phases):
+            timings[stage] = sum(atb.stats.phases.get(phase, 0) for phase in phases)
+    return timings, ri
+
+
+def run(sample_counts, seq_lens, repeats, scene_args, skip):
+    # Fix render output resolution for consistent results
+    bpy.context.scene.render.resolution_x = 800
+    bpy.context.scene.render.resolution_y = 600
+
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for samples in sample_counts:
+            for seq_len in seq_lens:
+                arg = arg_from_sim(samples, seq_len, POP_SIZE, RECOM, MU, SEED)
+                best = {}
+                for _ in range(repeats):
+                    timings, ri = _time_stages(arg, scene_args, skip, Path(out_dir))
+                    for stage, seconds in timings.items():
+                        best[stage] = min(seconds, best.get(stage, np.inf))
+
+                result = {
+                    "samples": samples,
+                    "seq_len": seq_len,
+                    "nodes": len(ri.nodes),
+                    "edges": len(ri.edges),
+                    "stages": {stage: best[stage] for stage in STAGES if stage in best},
+                }
+                results.append(result)
+                stages = " ".join(f"{stage}={seconds:.4f}" for stage, seconds in result["stages"].items())
+                print(f"samples={samples} seq_len={seq_len} nodes={result['nodes']} edges={result['edges']} {stages}")
+
+    return {
+        "metadata": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "bpy": bpy.app.version_string,
+            "repeats": repeats,
+            "seed": SEED,
+            **scene_args,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Stages slower than baseline by more than tolerance, as a fraction, for
+    grid points present in both
+    """
+    baseline_results = {(r["samples"], r["seq_len"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = baseline_results.get((result["samples"], result["seq_len"]))
+        if not base:
+            continue
+        for stage, seconds in result["stages"].items():
+            base_seconds = base["stages"].get(stage)
+            if base_seconds is None or base_seconds < MIN_COMPARED_SECONDS:
+                continue
+            if seconds > base_seconds * (1 + tolerance):
+                regressions.append({
+                    "samples": result["samples"],
+                    "seq_len": result["seq_len"],
+                    "stage": stage,
+                    "baseline": base_seconds,
+                    "current": seconds,
+                    "ratio": seconds / base_seconds,
+                })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, nargs="+", default=SAMPLE_COUNTS)
+    parser.add_argument("--seq-lens", type=int, nargs="+", default=SEQ_LENS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--skip", nargs="+", choices=STAGES[1:], default=[], help="stages not to run")
+    parser.add_argument("--batch", action="store_true", help="use batched node and edge scene build")
+    parser.add_argument("--render-profile", choices=RENDER_PROFILES, default="final")
+    parser.add_argument("--out", help="write results JSON to this file")
+    parser.add_argument("--baseline", help="compare against results JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 for 20%%")
+    args = parser.parse_args()
+
+    scene_args = {"batch_nodes": args.batch, "batch_edges": args.batch, "render_profile": args.render_profile}
+    current = run(args.samples, args.seq_lens, args.repeats, scene_args, set(args.skip))
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(current, baseline, args.tolerance)
+        for r in regressions:
+            print(
+                f"REGRESSION samples={r['samples']} seq_len={r['seq_len']} {r['stage']}: "
+                f"{r['baseline']:.4f}s -> {r['current']:.4f}s ({r['ratio']:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
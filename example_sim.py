@@ -29,10 +29,17 @@ def arg_from_sim(
     return arg
 
 if __name__ == "__main__":
-    arg = arg_from_sim(3, 1_000, 10_000, 2e-7, 2e-7, 1234)
+    # Cache render info keyed by simulation parameters, so re-rendering with
+    # different camera or style skips simulation, conversion and layout
+    sim_args = (3, 1_000, 10_000, 2e-7, 2e-7, 1234)
+    ri = ArgRenderInfo.cached(
+        "out/cache",
+        f"arg_from_sim{sim_args}",
+        lambda: ArgRenderInfo(arg_from_sim(*sim_args))
+    )
 
     ArgToBlender(
-        ArgRenderInfo(arg),
+        ri,
         png_out_file="out/sim.png",
         blender_out_file="out/sim.blend",
         text_scale = 0.3,
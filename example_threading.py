@@ -5,10 +5,9 @@ Generates various samples of threading samples into an ARG, rendering image
 of ARG and overlaying code at each stage.
 """
 import arg_needle_lib
-import bpy
 
 from arg_render_info import ArgRenderInfo
-from arg_to_blender import ArgToBlender
+from arg_render_pool import render_frames
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageEnhance, ImageFont
 
@@ -21,12 +20,6 @@ class ThreadingOps:
     end:   float
     thread_sample_args: list # Arguments passed to arg.thread_sample()
 
-Path("out/anims").mkdir(exist_ok=True, parents=True)
-
-# Fix render output resolution for consistent results
-bpy.context.scene.render.resolution_x = 800
-bpy.context.scene.render.resolution_y = 600
-
 # Use system font in Pillow for text rendering
 font = ImageFont.load_default(12)
 
@@ -95,69 +88,92 @@ threading_examples = [
     ])
 ]
 
-for tex in threading_examples:
-    frames = []
-    code_lines = []
-
-    def generate_frame():
-        frame_idx = len(frames) + 1
-        print(f"Frame {frame_idx}")
 
-        full_code_text = "\n".join(code_lines)
-        print(full_code_text)
-        print()
-
-        # Render using Blender
+def generate_frame(arg, code_lines, filename):
+    print(f"Frame {filename}")
+    print("\n".join(code_lines))
+    print()
+    #return ArgRenderInfo(arg, True), filename, list(code_lines)
+    return ArgRenderInfo(arg, False), filename, list(code_lines)
+
+
+def compose_frame(filename, code_lines):
+    # Draw code over ARG image
+    arg_img = Image.open(filename)
+    arg_draw = ImageDraw.Draw(arg_img)
+    text_pos = (60, arg_img.height - 160)
+    arg_draw.text(text_pos, "\n".join(code_lines), (0, 0, 0), font=font)
+
+    # Compositve over black background and boost contrast
+    bg_img = arg_img.copy()
+    bg_draw = ImageDraw.Draw(bg_img)
+    bg_draw.rectangle([(0, 0), bg_img.size], (255, 255, 255))
+    img = Image.alpha_composite(bg_img, arg_img)
+    enhancer = ImageEnhance.Contrast(img.convert('RGB'))
+    img = enhancer.enhance(1.5)
+    img.save(filename)
+    return img
+
+
+# Workers are spawned processes that re-import this file, so only run the
+# example from the main process
+if __name__ == "__main__":
+    Path("out/anims").mkdir(exist_ok=True, parents=True)
+
+    # Snapshot every frame of every example first, then render them all in
+    # parallel
+    example_frames = []
+    for tex in threading_examples:
+        frames = []
         dirname = f"out/{tex.name}"
-        filename = f"{dirname}/{frame_idx:03}.png"
-        #ri = ArgRenderInfo(arg, True)
-        ri = ArgRenderInfo(arg, False)
-        ArgToBlender(
-            arg_render_info=ri,
-            png_out_file=filename
-        )
-
-        # Draw code over ARG image
-        arg_img = Image.open(filename)
-        arg_draw = ImageDraw.Draw(arg_img)
-        text_pos = (60, arg_img.height - 160)
-        arg_draw.text(text_pos, full_code_text, (0, 0, 0), font=font)
-
-        # Compositve over black background and boost contrast
-        bg_img = arg_img.copy()
-        bg_draw = ImageDraw.Draw(bg_img)
-        bg_draw.rectangle([(0, 0), bg_img.size], (255, 255, 255))
-        img = Image.alpha_composite(bg_img, arg_img)
-        enhancer = ImageEnhance.Contrast(img.convert('RGB'))
-        img = enhancer.enhance(1.5)
-
-        frames.append(img)
-        img.save(filename)
-
-    # Show ARG as if each operation added per frame
-    arg_n = len(tex.thread_sample_args) + 1
-    arg = arg_needle_lib.ARG(tex.start, tex.end, arg_n)
-    arg.add_sample()
-    code_lines = ["arg.add_sample()"]
-    generate_frame()
-
-    for threading_args in tex.thread_sample_args:
-        # Add next sample and update code text
+
+        # Show ARG as if each operation added per frame
+        arg_n = len(tex.thread_sample_args) + 1
+        arg = arg_needle_lib.ARG(tex.start, tex.end, arg_n)
         arg.add_sample()
-        code_lines.append("arg.add_sample()")
-        generate_frame()
-
-        # Thread last sample with threading args and update code text
-        # Note formatting verbatim op.args tuple will generate brackets so new
-        # code line will look like "thread_sample([...], [...], [...])"
-        arg.thread_sample(*threading_args)
-        code_lines.append(f"thread_sample{threading_args}")
-        generate_frame()
-
-    # Save animated GIF
-    frames[0].save(
-        f"out/anims/{tex.name}.gif",
-        save_all=True,
-        append_images=frames[1:],
-        duration=1000
-    )
+        code_lines = ["arg.add_sample()"]
+        frames.append(generate_frame(arg, code_lines, f"{dirname}/{len(frames) + 1:03}.png"))
+
+        for threading_args in tex.thread_sample_args:
+            # Add next sample and update code text
+            arg.add_sample()
+            code_lines.append("arg.add_sample()")
+            frames.append(generate_frame(arg, code_lines, f"{dirname}/{len(frames) + 1:03}.png"))
+
+            # Thread last sample with threading args and update code text
+            # Note formatting verbatim op.args tuple will generate brackets so new
+            # code line will look like "thread_sample([...], [...], [...])"
+            arg.thread_sample(*threading_args)
+            code_lines.append(f"thread_sample{threading_args}")
+            frames.append(generate_frame(arg, code_lines, f"{dirname}/{len(frames) + 1:03}.png"))
+
+        example_frames.append((tex, frames))
+
+    # Fix render output resolution for consistent results, and log per-frame
+    # timings and datablock counts to find slow or leaking frames
+    all_frames = [(ri, filename) for _, frames in example_frames for ri, filename, _ in frames]
+    Path("out/anims/stats.jsonl").unlink(missing_ok=True)
+    png_files = iter(render_frames(
+        all_frames,
+        resolution=(800, 600),
+        stats=True,
+        stats_log="out/anims/stats.jsonl"
+    ))
+
+    for tex, frames in example_frames:
+        images = []
+        for _, _, code_lines in frames:
+            png_file = next(png_files)
+            if png_file is None:
+                print(f"Skipping failed frame in {tex.name}")
+                continue
+            images.append(compose_frame(png_file, code_lines))
+
+        # Save animated GIF
+        if images:
+            images[0].save(
+                f"out/anims/{tex.name}.gif",
+                save_all=True,
+                append_images=images[1:],
+                duration=1000
+            )